@@ -1,44 +1,28 @@
 # Level Generation Pipeline
-import cv2
+# Importing this module has no side effects: paths are resolved relative to this file,
+# directories are created when something is written, and the RandomForest difficulty model
+# (scikit-learn/joblib) is only loaded or trained on first use via get_model() or init().
+# OpenCV, torch and level_gan are imported by the functions that use them, so importing
+# GAN for its layout and rendering helpers stays cheap.
 import numpy as np
 import json
-import matplotlib.pyplot as plt
 import random
-from sklearn.ensemble import RandomForestRegressor
-import joblib  # Import joblib for model saving/loading
-from PIL import Image
-import torch
-import torch.nn as nn
-import torch.optim as optim
-import numpy as np
-import cv2
-import random
-from level_gan import LevelGAN
-from PIL import Image
+from asset_cache import background_image, box_sprite
 import os
-import sys
 
 # Define paths first
-levels_folder = '/Users/parthpsg/Documents/Professional/Coding/IPD/FInal-IPD/ai/game_levels'
-assets_folder = '/Users/parthpsg/Documents/Professional/Coding/IPD/FInal-IPD/ai/assets'
-template_path = os.path.join(assets_folder, 'box_template.png')
-background_path = os.path.join(assets_folder, 'space_background.png')
-model_path = '/Users/parthpsg/Documents/Professional/Coding/IPD/FInal-IPD/ai/model.pkl'  # Path for saved model
-
-# Update path definitions to match Final-IPD structure
-levels_folder = '/Users/parthpsg/Documents/Professional/Coding/IPD/FInal-IPD/ai/game_levels'
-assets_folder = '/Users/parthpsg/Documents/Professional/Coding/IPD/FInal-IPD/ai/assets'
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+levels_folder = os.path.join(BASE_DIR, 'game_levels')
+assets_folder = os.path.join(BASE_DIR, 'assets')
 template_path = os.path.join(assets_folder, 'box_template.png')
 background_path = os.path.join(assets_folder, 'space_background.png')
-model_path = '/Users/parthpsg/Documents/Professional/Coding/IPD/FInal-IPD/ai/model.pkl'
-output_folder = '/Users/parthpsg/Documents/Professional/Coding/IPD/FInal-IPD/ai/generated_levels'
-
-# Create necessary directories
-for directory in [levels_folder, assets_folder, output_folder]:
-    os.makedirs(directory, exist_ok=True)
+model_path = os.path.join(BASE_DIR, 'model.pkl')  # Path for saved model
+output_folder = os.path.join(BASE_DIR, 'generated_levels')
+fitted_generators_folder = os.path.join(BASE_DIR, 'models', 'fitted_generators')
 
 # Now define the functions that use these paths
 def get_reference_box_size(image_path):
+    import cv2
     img = cv2.imread(image_path)
     if img is None:
         raise FileNotFoundError(f"Could not load reference image: {image_path}")
@@ -61,6 +45,7 @@ def get_reference_box_size(image_path):
 reference_level = os.path.join(levels_folder, 'level_d0.5_s0.5.png')  # Use a middle-difficulty level as reference
 
 def process_level_image(image_path, debug=True):
+    import cv2
     print(f"Processing image: {image_path}")
     
     img = cv2.imread(image_path)
@@ -111,6 +96,7 @@ def process_level_image(image_path, debug=True):
     return filtered_points
 
 def normalize_block_size(template, target_size=(32, 32)):
+    import cv2
     return cv2.resize(template, target_size)
 
 # Update generate_layout function to use 32px spacing
@@ -200,20 +186,10 @@ def generate_layout(desired_difficulty, desired_score, model):
     
     return layout
 
-# Add at the top with other path definitions
-output_folder = '/Users/parthpsg/Documents/Professional/Coding/IPD/Final-IPD/ai/generated_levels'
-
-# Create output directory if it doesn't exist
-os.makedirs(output_folder, exist_ok=True)
-
 def render_layout(layout_data, output_path='generated_level.png', difficulty=None, score=None):
-    # Load background
-    bg = Image.open(background_path).convert('RGBA')
-    bg = bg.resize((800, 800))
-    
-    # Load box template
-    box = Image.open(template_path).convert("RGBA")
-    box = box.resize((32, 32))
+    # Background copy and box sprite from the shared asset cache
+    bg = background_image(background_path)
+    box = box_sprite(template_path)
     
     # Define safe zone for player ship (bottom 96 pixels)
     safe_zone_height = 228
@@ -246,6 +222,7 @@ def render_layout(layout_data, output_path='generated_level.png', difficulty=Non
         output_path += '.png'
     
     # Ensure the path is in the output folder
+    os.makedirs(output_folder, exist_ok=True)
     full_output_path = os.path.join(output_folder, output_path)
     
     # Save the image to the new location
@@ -267,16 +244,23 @@ def parse_level_info(filename):
     score = float(parts[2][1:-4])  # Remove 's' and '.png', convert to float
     return difficulty, score
 
-# Load game levels dynamically from folder
-game_levels = []
-for filename in os.listdir(levels_folder):
-    if filename.startswith('level_') and filename.endswith('.png'):
-        difficulty, score = parse_level_info(filename)
-        game_levels.append({
-            'file': os.path.join(levels_folder, filename),
-            'difficulty': difficulty,
-            'score': score
-        })
+# Game levels are scanned from levels_folder on first use
+_game_levels = None
+
+def load_game_levels(reload=False):
+    global _game_levels
+    if _game_levels is None or reload:
+        levels = []
+        for filename in sorted(os.listdir(levels_folder)) if os.path.isdir(levels_folder) else []:
+            if filename.startswith('level_') and filename.endswith('.png'):
+                difficulty, score = parse_level_info(filename)
+                levels.append({
+                    'file': os.path.join(levels_folder, filename),
+                    'difficulty': difficulty,
+                    'score': score
+                })
+        _game_levels = levels
+    return _game_levels
 
 def extract_features(layout):
     if not layout:
@@ -291,14 +275,26 @@ def extract_features(layout):
     
     return [num_boxes, avg_y, spacing]
 
-# Check if model.pkl exists and load or train model
-if os.path.exists(model_path):
-    model = joblib.load(model_path)
-    print("Loaded model from model.pkl")
-else:
+# Difficulty model: loaded from model.pkl, or trained on game_levels and saved, on first use
+_model = None
+
+def get_model():
+    global _model
+    if _model is None:
+        import joblib  # Import joblib for model saving/loading
+        if os.path.exists(model_path):
+            _model = joblib.load(model_path)
+            print("Loaded model from model.pkl")
+        else:
+            _model = _train_model()
+    return _model
+
+def _train_model():
+    from sklearn.ensemble import RandomForestRegressor
+    import joblib
     X = []
     y = []
-    for level in game_levels:
+    for level in load_game_levels():
         try:
             points = process_level_image(level['file'])
             if points:  # Only add if points were detected
@@ -311,41 +307,66 @@ else:
             print(f"Error processing {level['file']}: {e}")
             continue
     
-    if X and y:  # Only train if we have data
-        model = RandomForestRegressor()
-        model.fit(X, y)
-        joblib.dump(model, model_path)
-        print("Trained and saved model to model.pkl")
-    else:
-        print("Error: No valid training data found")
-        exit(1)
+    if not (X and y):  # Only train if we have data
+        raise RuntimeError(f"No valid training data found in {levels_folder}")
+    model = RandomForestRegressor()
+    model.fit(X, y)
+    joblib.dump(model, model_path)
+    print("Trained and saved model to model.pkl")
+    return model
+
+def init():
+    # Explicit startup step for scripts: create the output folder and load the difficulty model
+    os.makedirs(output_folder, exist_ok=True)
+    return get_model()
+
+def __getattr__(name):
+    # Backwards compatible `from GAN import model` / `GAN.game_levels`, resolved lazily
+    if name == 'model':
+        return get_model()
+    if name == 'game_levels':
+        return load_game_levels()
+    if name == 'LevelGenerator':
+        return get_level_generator_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Example usage:
 # desired_difficulty = float(input("Enter Difficulty: "))
 # desired_score = float(input("Enter Score: "))
-# layout_gen = generate_layout(desired_difficulty, desired_score, model)
+# layout_gen = generate_layout(desired_difficulty, desired_score, get_model())
 # render_layout(layout_gen)
-# predicted_diff = model.predict([extract_features_from_layout(layout_gen)])[0]
+# predicted_diff = get_model().predict([extract_features_from_layout(layout_gen)])[0]
 # print(f"New level image saved as 'level_d{desired_difficulty}_s{desired_score}.png'")
 # print(f"Predicted difficulty of the generated image: {predicted_diff:.2f}")
 
 
-class LevelGenerator(nn.Module):
-    def __init__(self):
-        super(LevelGenerator, self).__init__()
-        self.model = nn.Sequential(
-            nn.Linear(2, 128),
-            nn.LeakyReLU(0.2),
-            nn.Linear(128, 256),
-            nn.LeakyReLU(0.2),
-            nn.Linear(256, 512),
-            nn.LeakyReLU(0.2),
-            nn.Linear(512, 800),
-            nn.Tanh()
-        )
+# LevelGenerator is an nn.Module, so the class is built (and torch imported) on first use
+_level_generator_class = None
+
+def get_level_generator_class():
+    global _level_generator_class
+    if _level_generator_class is None:
+        import torch.nn as nn
+        
+        class LevelGenerator(nn.Module):
+            def __init__(self):
+                super(LevelGenerator, self).__init__()
+                self.model = nn.Sequential(
+                    nn.Linear(2, 128),
+                    nn.LeakyReLU(0.2),
+                    nn.Linear(128, 256),
+                    nn.LeakyReLU(0.2),
+                    nn.Linear(256, 512),
+                    nn.LeakyReLU(0.2),
+                    nn.Linear(512, 800),
+                    nn.Tanh()
+                )
+                
+            def forward(self, x):
+                return self.model(x)
         
-    def forward(self, x):
-        return self.model(x)
+        _level_generator_class = LevelGenerator
+    return _level_generator_class
 
 def create_target_pattern(difficulty, score):
     pattern = np.zeros(800)
@@ -389,8 +410,11 @@ def create_target_pattern(difficulty, score):
     
     return pattern
 
-def generate_and_train(difficulty, score, num_epochs=100):
-    generator = LevelGenerator()
+def fit_generator(difficulty, score, num_epochs=100):
+    import torch
+    import torch.nn as nn
+    import torch.optim as optim
+    generator = get_level_generator_class()()
     optimizer = optim.Adam(generator.parameters(), lr=0.001)
     criterion = nn.MSELoss()
     
@@ -415,6 +439,26 @@ def generate_and_train(difficulty, score, num_epochs=100):
         total_loss.backward()
         optimizer.step()
     
+    return generator
+
+# Fitted generators are memoized per quantized (difficulty, score), created on first use
+_generator_registry = None
+
+def get_generator_registry():
+    global _generator_registry
+    if _generator_registry is None:
+        from generator_registry import FittedGeneratorRegistry
+        _generator_registry = FittedGeneratorRegistry(get_level_generator_class(), fit_generator, fitted_generators_folder)
+    return _generator_registry
+
+def generate_and_train(difficulty, score, num_epochs=100, use_registry=True):
+    # With the registry only the first call per grid point trains; use_registry=False fits a fresh generator
+    import torch
+    if use_registry:
+        generator = get_generator_registry().get(difficulty, score, num_epochs)
+    else:
+        generator = fit_generator(difficulty, score, num_epochs)
+    
     # Generate final layout
     with torch.no_grad():
         generated = generator(torch.FloatTensor([[difficulty, score]]))
@@ -423,13 +467,9 @@ def generate_and_train(difficulty, score, num_epochs=100):
         return generated
 
 def render_enhanced_layout(layout_data, difficulty, score, output_path='generated_level.png'):
-    # Load background
-    bg = Image.open(background_path).convert('RGBA')
-    bg = bg.resize((800, 800))
-    
-    # Load box template
-    box = Image.open(template_path).convert("RGBA")
-    box = box.resize((32, 32))
+    # Background copy and box sprite from the shared asset cache
+    bg = background_image(background_path)
+    box = box_sprite(template_path)
     
     # Convert layout data to 2D grid for better placement
     grid = layout_data.reshape(32, 25)
@@ -450,6 +490,8 @@ def render_enhanced_layout(layout_data, difficulty, score, output_path='generate
     bg.save(output_path)
 
 def main():
+    from level_gan import LevelGAN
+    init()
     level_gan = LevelGAN()
     
     while True:
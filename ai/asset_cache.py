@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+
+from PIL import Image
+
+# Process-wide cache of decoded, RGBA-converted and resized sprite assets.
+# Each (path, size) is decoded once; callers get the shared image (read-only) or a copy.
+# The file's mtime is re-checked at most every `reload_interval` seconds and the asset is
+# reloaded when it changes on disk.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(BASE_DIR, 'assets')
+BACKGROUND_PATH = os.path.join(ASSETS_DIR, 'space_background.png')
+BOX_TEMPLATE_PATH = os.path.join(ASSETS_DIR, 'box_template.png')
+BACKGROUND_SIZE = (800, 800)
+BOX_SPRITE_SIZE = (32, 32)
+
+
+class _CachedAsset:
+    def __init__(self, image, mtime):
+        self.image = image
+        self.mtime = mtime
+        self.checked_at = time.monotonic()
+        self.derived = {}
+
+
+class AssetCache:
+    def __init__(self, reload_interval=1.0):
+        self.reload_interval = reload_interval
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def _load(self, path, size):
+        mtime = os.path.getmtime(path)
+        with Image.open(path) as img:
+            image = img.convert('RGBA').resize(size)
+        return _CachedAsset(image, mtime)
+
+    def _entry(self, path, size):
+        key = (os.path.abspath(path), tuple(size))
+        entry = self._assets.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked_at < self.reload_interval:
+            return entry
+        with self._lock:
+            entry = self._assets.get(key)
+            if entry is None:
+                entry = self._assets[key] = self._load(*key)
+            elif now - entry.checked_at >= self.reload_interval:
+                entry.checked_at = now
+                try:
+                    changed = os.path.getmtime(key[0]) != entry.mtime
+                except OSError:
+                    changed = False  # Keep serving the cached copy if the file disappears
+                if changed:
+                    print(f"Reloading asset {key[0]}")
+                    entry = self._assets[key] = self._load(*key)
+        return entry
+
+    def get(self, path, size):
+        # Shared instance: callers must not draw on it
+        return self._entry(path, size).image
+
+    def copy(self, path, size):
+        return self._entry(path, size).image.copy()
+
+    def derived(self, path, size, name, build):
+        # Cache a value computed from the asset (e.g. a tiled sprite layer); rebuilt on reload
+        entry = self._entry(path, size)
+        value = entry.derived.get(name)
+        if value is None:
+            value = entry.derived[name] = build(entry.image)
+        return value
+
+    def preload(self, assets):
+        for path, size in assets:
+            self._entry(path, size)
+
+    def clear(self):
+        with self._lock:
+            self._assets.clear()
+
+
+asset_cache = AssetCache()
+
+
+def background_image(path=BACKGROUND_PATH):
+    return asset_cache.copy(path, BACKGROUND_SIZE)
+
+
+def box_sprite(path=BOX_TEMPLATE_PATH):
+    return asset_cache.get(path, BOX_SPRITE_SIZE)
@@ -0,0 +1,305 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Request-coalescing inference queue for LevelGAN.
+# Concurrent requests are collected for up to `max_wait_ms` (or until `max_batch_size`
+# requests are waiting), run through one batched Generator/LevelLSTM forward pass and
+# resolved individually. Up to `max_concurrent_batches` batches run at once (by default one
+# per backend worker), and the next batch is collected while earlier ones are still running.
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 3.0
+LATENCY_WINDOW = 1024  # Number of recent samples kept per stage for percentiles
+
+# LevelGAN used by generate_pattern_batch. Set directly for in-process execution, or by
+# init_worker in each process of a process-pool backend.
+_worker_gan = None
+
+
+def set_worker_gan(level_gan):
+    global _worker_gan
+    _worker_gan = level_gan
+
+
+def init_worker(state_dicts, num_threads=1, compile_mode=None, warmup_batch_sizes=(), serving_models=None):
+    # Process-pool initializer: build the model once per worker with the parent's weights,
+    # optionally compile the generator and run warmup batches for each served model
+    import torch
+    from level_gan import LevelGAN
+    torch.set_num_threads(num_threads)
+    serving_models = tuple(serving_models or state_dicts)
+    level_gan = LevelGAN(inference_only=True, models=serving_models)
+    for use_model, state_dict in state_dicts.items():
+        level_gan.model_for(use_model).load_state_dict(state_dict)
+    if 'gan' in serving_models:
+        level_gan.compile_generator(compile_mode)
+    for use_model in serving_models:
+        level_gan.warmup(warmup_batch_sizes, use_model=use_model)
+    set_worker_gan(level_gan)
+
+
+def generate_pattern_batch(conditions, use_model, seeds, candidates=1):
+    # One batched forward pass plus post-processing; returns the patterns and stage timings.
+    # With candidates > 1 unplayable levels are redrawn (see playability.post_process_playable).
+    from level_gan import post_process_patterns
+    from playability import post_process_playable
+    start = time.perf_counter()
+    raw_patterns = _worker_gan.generate_raw_patterns(conditions, use_model=use_model)
+    inferred_at = time.perf_counter()
+    if candidates > 1:
+        patterns = list(post_process_playable(raw_patterns, conditions[:, 0], conditions[:, 1], seeds=seeds, candidates=candidates)[0])
+    else:
+        patterns = list(post_process_patterns(raw_patterns, conditions[:, 0], conditions[:, 1], seeds=seeds))
+    done_at = time.perf_counter()
+    return patterns, {'inference': inferred_at - start, 'post_process': done_at - inferred_at}
+
+
+def check_seed(seed):
+    # Rejected before queueing: np.random.default_rng raises on it mid-batch otherwise
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, (int, np.integer)) or seed < 0):
+        raise ValueError(f"Seed must be a non-negative integer, got {seed!r}.")
+
+
+class _PendingRequest:
+    __slots__ = ('difficulty', 'score', 'use_model', 'seed', 'session_id', 'future', 'enqueued_at')
+
+    def __init__(self, difficulty, score, use_model, seed, future, session_id=None):
+        self.difficulty = difficulty
+        self.score = score
+        self.use_model = use_model
+        self.seed = seed
+        self.session_id = session_id
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceMetrics:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.batch_sizes = {}
+        self.batches = 0
+        self.requests = 0
+        self.stages = {}
+        self.window = window
+        # Stages are recorded from executor threads while snapshots run on the event loop
+        self._lock = threading.Lock()
+
+    def record_batch(self, size):
+        with self._lock:
+            self._record_batch(size)
+
+    def _record_batch(self, size):
+        self.batches += 1
+        self.requests += size
+        self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+
+    def record_stage(self, stage, seconds):
+        with self._lock:
+            self._record_stage(stage, seconds)
+
+    def _record_stage(self, stage, seconds):
+        samples = self.stages.get(stage)
+        if samples is None:
+            samples = self.stages[stage] = {'count': 0, 'total': 0.0, 'max': 0.0, 'recent': deque(maxlen=self.window)}
+        samples['count'] += 1
+        samples['total'] += seconds
+        samples['max'] = max(samples['max'], seconds)
+        samples['recent'].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        stages = {}
+        for stage, samples in self.stages.items():
+            recent = np.array(samples['recent']) * 1000.0
+            stages[stage] = {
+                'count': samples['count'],
+                'mean_ms': samples['total'] * 1000.0 / samples['count'],
+                'max_ms': samples['max'] * 1000.0,
+                'p50_ms': float(np.percentile(recent, 50)),
+                'p95_ms': float(np.percentile(recent, 95)),
+                'p99_ms': float(np.percentile(recent, 99)),
+            }
+        return {
+            'batches': self.batches,
+            'requests': self.requests,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'batch_size_histogram': {str(k): v for k, v in sorted(self.batch_sizes.items())},
+            'stages': stages,
+        }
+
+
+class BatchInferenceEngine:
+    def __init__(self, level_gan=None, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS, backend=None,
+                 session_cache=None, candidates=1, max_concurrent_batches=None):
+        # Batches run on `backend` (an ExecutionBackend) or, without one, on the loop's default
+        # executor. Pass level_gan for in-process execution; process-pool workers build their own.
+        # Session batches (an LSTMSessionCache) always run in this process, where the session state lives.
+        # candidates > 1 redraws levels that fail the playability check, up to that many draws per level.
+        if max_batch_size < 1: raise ValueError("max_batch_size must be at least 1.")
+        if max_concurrent_batches is None: max_concurrent_batches = backend.max_workers if backend is not None else (os.cpu_count() or 1)
+        if max_concurrent_batches < 1: raise ValueError("max_concurrent_batches must be at least 1.")
+        if level_gan is not None: set_worker_gan(level_gan)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.backend = backend
+        self.session_cache = session_cache
+        self.candidates = candidates
+        self.max_concurrent_batches = max_concurrent_batches
+        self.metrics = InferenceMetrics()
+        self._queue = None
+        self._worker = None
+        self._slots = None
+        self._session_lock = None
+        self._inflight = set()
+
+    async def start(self):
+        if self._worker is not None: return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._session_lock = asyncio.Lock()  # FIFO, so session steps keep their batch order
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None: return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        for task in list(self._inflight): task.cancel()
+        await asyncio.gather(*self._inflight, return_exceptions=True)
+        while not self._queue.empty():
+            request = self._queue.get_nowait()
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("Inference engine stopped."))
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def generate(self, difficulty, score, use_model='gan', seed=None):
+        if self._worker is None: raise RuntimeError("Inference engine is not running.")
+        check_seed(seed)
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingRequest(difficulty, score, use_model, seed, future))
+        return await future
+
+    async def generate_for_session(self, session_id, difficulty, score, seed=None):
+        # Next level of a session's LSTM sequence; returns (pattern, step)
+        if self._worker is None: raise RuntimeError("Inference engine is not running.")
+        if self.session_cache is None: raise RuntimeError("Sessions are not enabled.")
+        check_seed(seed)
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingRequest(difficulty, score, self.session_cache.use_model, seed, future, session_id))
+        return await future
+
+    def stats(self):
+        snapshot = self.metrics.snapshot()
+        snapshot.update({
+            'queue_depth': self.queue_depth,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'candidates': self.candidates,
+            'max_concurrent_batches': self.max_concurrent_batches,
+            'batches_inflight': len(self._inflight),
+        })
+        return snapshot
+
+    async def _collect_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0: break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _execute(self, fn, *args):
+        if self.backend is not None: return await self.backend.run(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _run(self):
+        # A free slot is taken before collecting, so requests keep filling the next batch
+        # while all slots are busy
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task):
+        self._inflight.discard(task)
+        self._slots.release()
+
+    async def _dispatch(self, batch):
+        try:
+            await self._run_batch(batch)
+        except asyncio.CancelledError:
+            for request in batch:
+                if not request.future.done(): request.future.set_exception(RuntimeError("Inference engine stopped."))
+            raise
+
+    async def _run_batch(self, batch):
+        dispatched_at = time.perf_counter()
+        for request in batch:
+            self.metrics.record_stage('queue_wait', dispatched_at - request.enqueued_at)
+        self.metrics.record_batch(len(batch))
+        # A batch may mix models and session steps; each group gets its own forward pass
+        groups = {}
+        for request in batch:
+            groups.setdefault((request.use_model, request.session_id is not None), []).append(request)
+        # Session groups go first, so the session lock is taken in batch order
+        for (use_model, sessions), requests in sorted(groups.items(), key=lambda item: not item[0][1]):
+            try:
+                patterns, timings = await self._run_group(use_model, sessions, requests)
+            except Exception as e:
+                if len(requests) == 1 or sessions:
+                    # Session steps have already advanced their LSTM state, so they are not rerun
+                    for request in requests:
+                        if not request.future.done(): request.future.set_exception(e)
+                    continue
+                # One bad request must not fail the rest of its group: rerun them one by one
+                for request in requests:
+                    await self._run_isolated(use_model, sessions, request)
+                continue
+            self._resolve(requests, patterns, timings)
+
+    async def _run_group(self, use_model, sessions, requests):
+        conditions = np.array([[r.difficulty, r.score] for r in requests], dtype=np.float64)
+        seeds = [r.seed for r in requests]
+        if sessions:
+            async with self._session_lock:
+                patterns, steps, timings = await asyncio.get_running_loop().run_in_executor(
+                    None, self.session_cache.generate, [r.session_id for r in requests], conditions[:, 0], conditions[:, 1], seeds, self.candidates)
+            return list(zip(patterns, steps)), timings
+        return await self._execute(generate_pattern_batch, conditions, use_model, seeds, self.candidates)
+
+    async def _run_isolated(self, use_model, sessions, request):
+        try:
+            patterns, timings = await self._run_group(use_model, sessions, [request])
+        except Exception as e:
+            if not request.future.done(): request.future.set_exception(e)
+            return
+        self._resolve([request], patterns, timings)
+
+    def _resolve(self, requests, patterns, timings):
+        for stage, seconds in timings.items():
+            self.metrics.record_stage(stage, seconds)
+        for request, pattern in zip(requests, patterns):
+            if not request.future.done(): request.future.set_result(pattern)
@@ -0,0 +1,191 @@
+# Benchmark suite for the level-generation hot paths
+# Times generation (GAN and LSTM at several batch sizes), post-processing per difficulty tier,
+# image_to_pattern, the layout / compositing / PNG steps of the /generate-level handler,
+# GAN.render_layout and the rating and playability checks. Fixtures are synthetic and seeded
+# (levels come from post_process_patterns, images are rendered from them into a temp
+# directory), so runs on the same machine are comparable. Results can be written as JSON and
+# compared against a stored baseline; a case whose median slows down by more than the
+# threshold is a regression and makes the run exit with status 1.
+#
+# Examples:
+#   python benchmark.py --json bench.json
+#   python benchmark.py --baseline bench.json --threshold 0.2
+#   python benchmark.py --only post_process,render --repeats 100
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from inference_benchmark import time_batches
+
+SEED = 1234
+TIERS = {'easy': 0.15, 'medium': 0.5, 'hard': 0.85}
+DEFAULT_BATCH_SIZES = '1,8,32'
+DEFAULT_THRESHOLD = 0.25
+
+
+def build_fixtures(tmp_dir):
+    # Seeded levels per tier and a rendered PNG of each
+    from level_gan import post_process_patterns
+    from level_render import render_level_image
+    rng = np.random.default_rng(SEED)
+    fixtures = {'raw': rng.random((1, 625)), 'patterns': {}, 'images': {}}
+    for tier, difficulty in TIERS.items():
+        pattern = post_process_patterns(fixtures['raw'], [difficulty], [0.5], seeds=[SEED])[0]
+        fixtures['patterns'][tier] = pattern
+        path = os.path.join(tmp_dir, f'level_{tier}.png')
+        with open(path, 'wb') as f:
+            f.write(render_level_image(pattern, difficulty, 'PNG')[1])
+        fixtures['images'][tier] = path
+    return fixtures
+
+
+def benchmark_cases(batch_sizes, tmp_dir):
+    # name -> (fn, argument); cases sharing a group are timed round-robin against each other
+    import torch
+    import GAN
+    from level_gan import LevelGAN
+    from level_render import pattern_to_layout, render_pattern, render_level_image, tile_sprite, IMAGE_SAVE_OPTIONS
+    from asset_cache import asset_cache, BACKGROUND_PATH, BACKGROUND_SIZE, BOX_TEMPLATE_PATH, BOX_SPRITE_SIZE
+    from level_ratings import analyze_level_pattern
+    from grid_ratings import rate_grids
+    from playability import is_playable, post_process_playable
+
+    torch.manual_seed(SEED)
+    fixtures = build_fixtures(tmp_dir)
+    level_gan = LevelGAN(inference_only=True, models=('gan', 'lstm'))
+    level_gan.compile_generator('script')
+    level_gan.warmup(batch_sizes)
+    level_gan.warmup(batch_sizes, use_model='lstm')
+    GAN.output_folder = tmp_dir  # render_layout writes its PNG here instead of generated_levels/
+    background = asset_cache.get(BACKGROUND_PATH, BACKGROUND_SIZE)
+    tiled_box = asset_cache.derived(BOX_TEMPLATE_PATH, BOX_SPRITE_SIZE, 'tiled', tile_sprite)
+
+    groups = {}
+    rng = np.random.default_rng(SEED)
+    for size in batch_sizes:
+        conditions = rng.random((size, 2))
+        seeds = list(range(size))
+        groups[f'generate_level/b{size}'] = {
+            f'generate_level/gan/b{size}': (lambda c, s=seeds: level_gan.generate_levels(c[:, 0], c[:, 1], 'gan', s), conditions),
+            f'generate_level/lstm/b{size}': (lambda c, s=seeds: level_gan.generate_levels(c[:, 0], c[:, 1], 'lstm', s), conditions),
+        }
+    groups['post_process'] = {
+        f'post_process/{tier}': (lambda d: level_gan._post_process_pattern_enhanced(
+            fixtures['raw'][0], d, 0.5, rng=np.random.default_rng(SEED)), difficulty)
+        for tier, difficulty in TIERS.items()}
+    groups['post_process_playable'] = {
+        f'post_process_playable/{tier}': (lambda d: post_process_playable(fixtures['raw'], [d], [0.5], seeds=[SEED]), difficulty)
+        for tier, difficulty in TIERS.items()}
+    groups['image_to_pattern'] = {
+        f'image_to_pattern/{tier}': (level_gan.image_to_pattern, path) for tier, path in fixtures['images'].items()}
+
+    def encode_png(frame):
+        buffer = io.BytesIO()
+        frame.save(buffer, format='PNG', **IMAGE_SAVE_OPTIONS['PNG'])
+        return buffer
+    hard = fixtures['patterns']['hard']
+    hard_frame = render_pattern(hard, background, tiled_box, TIERS['hard'])[1]
+    groups['main'] = {
+        'main/layout': (pattern_to_layout, hard),
+        'main/compose': (lambda p: render_pattern(p, background, tiled_box, TIERS['hard']), hard),
+        'main/png_encode': (encode_png, hard_frame),
+        'main/render_level_image': (lambda p: render_level_image(p, TIERS['hard'], 'PNG'), hard),
+    }
+    groups['render_layout'] = {'GAN.render_layout': (lambda p: GAN.render_layout(p, 'benchmark_level.png'), hard)}
+    groups['analyze_level_pattern'] = {
+        f'analyze_level_pattern/{tier}': (analyze_level_pattern, path) for tier, path in fixtures['images'].items()}
+    batch = np.stack(list(fixtures['patterns'].values()) * 11)[:32]
+    groups['grid_checks'] = {
+        'rate_grids/b32': (rate_grids, batch),
+        'is_playable/b32': (is_playable, batch),
+    }
+    return groups
+
+
+def run_benchmarks(batch_sizes, repeats, only=None):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with contextlib.redirect_stdout(io.StringIO()):  # Generation and post-processing print per call
+            groups = benchmark_cases(batch_sizes, tmp_dir)
+        for group in groups.values():
+            cases = {name: case for name, case in group.items() if not only or any(part in name for part in only)}
+            if not cases: continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                for fn, argument in cases.values(): fn(argument)  # Warm caches outside the timed runs
+                # time_batches passes one shared argument, so bind each case's own
+                latencies = time_batches({name: (lambda _, fn=fn, argument=argument: fn(argument))
+                                          for name, (fn, argument) in cases.items()}, None, repeats)
+            for name, samples in latencies.items():
+                results[name] = {
+                    'p50_ms': float(np.percentile(samples, 50)),
+                    'p95_ms': float(np.percentile(samples, 95)),
+                    'mean_ms': float(samples.mean()),
+                }
+                print(f"{name:<36} p50 {results[name]['p50_ms']:9.3f} ms  p95 {results[name]['p95_ms']:9.3f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Cases whose p50 is more than `threshold` (a fraction) slower than the baseline
+    regressions = []
+    print(f"\n{'case':<36} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<36} {'-':>10} {stats['p50_ms']:>10.3f} {'new':>8}")
+            continue
+        change = stats['p50_ms'] / before['p50_ms'] - 1
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f"{name:<36} {before['p50_ms']:>10.3f} {stats['p50_ms']:>10.3f} {change:>+7.1%}{flag}")
+        if change > threshold: regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the level-generation hot paths on synthetic, seeded fixtures.")
+    parser.add_argument('--batch-sizes', default=DEFAULT_BATCH_SIZES, help="Comma separated generate_level batch sizes")
+    parser.add_argument('--repeats', type=int, default=50, help="Timed calls per case")
+    parser.add_argument('--threads', type=int, default=1, help="torch intra-op threads")
+    parser.add_argument('--only', help="Comma separated substrings; only matching cases run")
+    parser.add_argument('--json', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="JSON file of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative p50 slowdown counted as a regression (default 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    import torch
+    torch.set_num_threads(args.threads)
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+    only = [part.strip() for part in args.only.split(',')] if args.only else None
+    results = run_benchmarks(batch_sizes, args.repeats, only)
+
+    report = {
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__, 'torch': torch.__version__,
+                    'platform': platform.platform(), 'cpus': os.cpu_count(), 'threads': args.threads},
+        'repeats': args.repeats,
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nNo regressions over {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# Offline bulk level generation
+# Runs LevelGAN over a grid or list of (difficulty, score, seed) triples in large tensor
+# batches, fans post-processing and rendering out over a process pool and writes the levels
+# into sharded output directories with a manifest. Re-running with the same arguments skips
+# levels already listed in the manifest, so an interrupted run can be resumed. Like the server,
+# levels that fail the playability check are redrawn (--candidates, 1 keeps the first draw).
+#
+# Examples:
+#   python bulk_generate.py --difficulties 0:1:21 --scores 0:1:21 --seeds 0:10 --out catalog
+#   python bulk_generate.py --spec levels.csv --out catalog --workers 8
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from playability import DEFAULT_CANDIDATES
+
+MANIFEST_NAME = 'manifest.jsonl'
+
+
+def parse_range(text, integer=False):
+    # "start:stop:count" -> evenly spaced values (inclusive), "start:stop" for integers -> range, or a single value
+    parts = text.split(':')
+    if integer:
+        if len(parts) == 1: return [int(parts[0])]
+        return list(range(int(parts[0]), int(parts[1])))
+    if len(parts) == 1: return [float(parts[0])]
+    start, stop, count = float(parts[0]), float(parts[1]), int(parts[2]) if len(parts) > 2 else 11
+    return [round(v, 6) for v in np.linspace(start, stop, count)]
+
+
+def load_spec(path):
+    # CSV with difficulty,score[,seed] columns, or JSON lines with the same keys
+    with open(path) as f:
+        if path.endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return [(float(r['difficulty']), float(r['score']), int(r['seed']) if r.get('seed') not in (None, '') else None) for r in rows]
+
+
+def build_jobs(args):
+    if args.spec:
+        triples = load_spec(args.spec)
+    else:
+        seeds = parse_range(args.seeds, integer=True) if args.seeds else [None]
+        triples = list(itertools.product(parse_range(args.difficulties), parse_range(args.scores), seeds))
+    jobs = []
+    for index, (difficulty, score, seed) in enumerate(triples):
+        if not (0 <= difficulty <= 1 and 0 <= score <= 1):
+            raise ValueError(f"Entry {index}: difficulty/score must be 0-1, got {difficulty}, {score}.")
+        # Unseeded entries get a seed derived from their position so the catalog is reproducible
+        if seed is None: seed = args.base_seed + index
+        jobs.append({'id': f'{index:07d}', 'difficulty': difficulty, 'score': score, 'seed': seed, 'candidates': args.candidates})
+    return jobs
+
+
+def load_manifest(out_dir):
+    done = {}
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path): return done
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partially written last line of an interrupted run
+            done[entry['id']] = entry
+    return done
+
+
+def is_complete(entry, job, out_dir, want_image):
+    if (entry['difficulty'], entry['score'], entry['seed']) != (job['difficulty'], job['score'], job['seed']): return False
+    if entry.get('candidates', 1) != job['candidates']: return False  # Manifests from before the playability check
+    if want_image and not entry.get('image'): return False
+    return all(os.path.exists(os.path.join(out_dir, entry[key])) for key in ('layout', 'image') if entry.get(key))
+
+
+def render_chunk(jobs, raw_patterns, out_dir, shard_size, image_format, save_options):
+    # Worker task: post-process a chunk of raw patterns (redrawing unplayable levels) and write each level's files
+    from playability import post_process_playable
+    from level_render import pattern_to_layout, render_level_image
+    difficulties = [job['difficulty'] for job in jobs]
+    scores = [job['score'] for job in jobs]
+    patterns, playable = post_process_playable(raw_patterns, difficulties, scores, seeds=[job['seed'] for job in jobs],
+                                               candidates=jobs[0]['candidates'])
+    entries = []
+    for job, pattern, is_playable in zip(jobs, patterns, playable):
+        shard = f'shard_{int(job["id"]) // shard_size:05d}'
+        os.makedirs(os.path.join(out_dir, shard), exist_ok=True)
+        name = f'level_{job["id"]}_d{job["difficulty"]:.3f}_s{job["score"]:.3f}'
+        entry = dict(job, shard=shard, platforms=int(pattern.sum()), playable=bool(is_playable))
+        layout = pattern_to_layout(pattern)
+        entry['layout'] = os.path.join(shard, f'{name}.txt')
+        with open(os.path.join(out_dir, entry['layout']), 'w') as f:
+            json.dump(layout, f)
+        if image_format:
+            _, image_bytes = render_level_image(pattern, job['difficulty'], image_format, save_options)
+            entry['image'] = os.path.join(shard, f'{name}.{image_format.lower()}')
+            with open(os.path.join(out_dir, entry['image']), 'wb') as f:
+                f.write(image_bytes)
+        entries.append(entry)
+    return entries
+
+
+def init_pool_worker():
+    import torch
+    torch.set_num_threads(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a catalog of levels without the interactive prompt.")
+    parser.add_argument('--spec', help="CSV or JSON-lines file of difficulty,score[,seed] entries")
+    parser.add_argument('--difficulties', default='0:1:11', help="start:stop:count grid of difficulties (default 0:1:11)")
+    parser.add_argument('--scores', default='0:1:11', help="start:stop:count grid of scores (default 0:1:11)")
+    parser.add_argument('--seeds', help="start:stop range of seeds per grid point (default: one derived seed)")
+    parser.add_argument('--base-seed', type=int, default=0, help="Seed offset for entries without a seed")
+    parser.add_argument('--model', default='gan', choices=['gan', 'lstm', 'gan_int8', 'lstm_int8'],
+                        help="*_int8 runs the int8-quantized model (see quantization_report.py)")
+    parser.add_argument('--candidates', type=int, default=DEFAULT_CANDIDATES,
+                        help="Draws per level until one passes the playability check (1 = unfiltered first draws)")
+    parser.add_argument('--out', required=True, help="Output directory (shards and manifest)")
+    parser.add_argument('--batch-size', type=int, default=1024, help="Levels per model forward pass")
+    parser.add_argument('--chunk-size', type=int, default=64, help="Levels per worker task")
+    parser.add_argument('--shard-size', type=int, default=1000, help="Levels per shard directory")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--format', default='png', choices=['png', 'webp', 'none'], help="Image format, or none for layouts only")
+    parser.add_argument('--png-compression', type=int, default=6, choices=range(10), metavar='0-9',
+                        help="zlib level for PNGs; PNG encoding dominates render time, 1 is ~3x faster than the default 6")
+    args = parser.parse_args()
+    args.candidates = max(1, args.candidates)
+
+    jobs = build_jobs(args)
+    os.makedirs(args.out, exist_ok=True)
+    done = load_manifest(args.out)
+    pending = [job for job in jobs if not (job['id'] in done and is_complete(done[job['id']], job, args.out, args.format != 'none'))]
+    print(f"{len(jobs)} levels requested, {len(jobs) - len(pending)} already written, {len(pending)} to generate")
+    if not pending: return
+
+    from level_gan import LevelGAN
+    level_gan = LevelGAN(inference_only=True, models=(args.model,))
+    image_format = None if args.format == 'none' else args.format.upper()
+    save_options = {'compress_level': args.png_compression} if image_format == 'PNG' else None
+
+    start = time.perf_counter()
+    written = 0
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context, initializer=init_pool_worker) as pool, \
+            open(os.path.join(args.out, MANIFEST_NAME), 'a') as manifest:
+        for batch_start in range(0, len(pending), args.batch_size):
+            batch = pending[batch_start:batch_start + args.batch_size]
+            conditions = np.array([[job['difficulty'], job['score']] for job in batch])
+            raw_patterns = level_gan.generate_raw_patterns(conditions, use_model=args.model)
+            futures = [pool.submit(render_chunk, batch[i:i + args.chunk_size], raw_patterns[i:i + args.chunk_size],
+                                   args.out, args.shard_size, image_format, save_options)
+                       for i in range(0, len(batch), args.chunk_size)]
+            for future in futures:
+                for entry in future.result():
+                    manifest.write(json.dumps(entry) + '\n')
+                    written += 1
+            manifest.flush()
+            elapsed = time.perf_counter() - start
+            print(f"{written}/{len(pending)} levels written, {written / elapsed:.1f} levels/s")
+
+    elapsed = time.perf_counter() - start
+    print(f"Done: {written} levels in {elapsed:.1f}s ({written / elapsed:.1f} levels/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Execution backend for the CPU-bound stages of level generation (torch inference,
+# PIL compositing, PNG encoding). Work runs on a thread pool (torch and PIL release the
+# GIL) or on a process pool whose workers are initialised once, e.g. with a preloaded model.
+# Admission is bounded: once `max_inflight` requests are running, new ones are rejected
+# with BackendSaturated so the server can answer 503 instead of queueing without limit.
+
+BACKEND_MODES = ('thread', 'process')
+DEFAULT_MAX_INFLIGHT = 64
+LATENCY_SMOOTHING = 0.2  # EWMA factor for the request latency used in Retry-After
+
+
+class BackendSaturated(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Server is at capacity, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class _Admission:
+    def __init__(self, backend):
+        self.backend = backend
+        self.started_at = None
+
+    def __enter__(self):
+        backend = self.backend
+        if backend.inflight >= backend.max_inflight:
+            backend.rejected += 1
+            raise BackendSaturated(backend.retry_after())
+        backend.inflight += 1
+        backend.admitted += 1
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        backend = self.backend
+        backend.inflight -= 1
+        elapsed = time.perf_counter() - self.started_at
+        if backend.mean_latency is None:
+            backend.mean_latency = elapsed
+        else:
+            backend.mean_latency += LATENCY_SMOOTHING * (elapsed - backend.mean_latency)
+        return False
+
+
+class ExecutionBackend:
+    def __init__(self, mode='thread', max_workers=None, max_inflight=DEFAULT_MAX_INFLIGHT, initializer=None, initargs=()):
+        if mode not in BACKEND_MODES: raise ValueError(f"Backend mode must be one of {BACKEND_MODES}.")
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_inflight = max_inflight
+        # Admission counters are only touched from the event loop thread
+        self.inflight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.mean_latency = None
+        if mode == 'thread':
+            if initializer is not None: initializer(*initargs)
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='level-gen')
+        else:
+            # spawn: forking a process that already runs torch threads is not safe
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=initializer, initargs=initargs)
+
+    def admit(self):
+        # Use as `with backend.admit():` around one request; raises BackendSaturated when full
+        return _Admission(self)
+
+    def retry_after(self):
+        # Roughly how long until a slot frees up: one average request, in whole seconds
+        if self.mean_latency is None: return 1
+        return max(1, math.ceil(self.mean_latency))
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def warmup(self):
+        # Process pools start workers on demand; start (and initialise) all of them up front
+        if self.mode == 'process':
+            await asyncio.gather(*[self.run(os.getpid) for _ in range(self.max_workers)])
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'max_workers': self.max_workers,
+            'max_inflight': self.max_inflight,
+            'inflight': self.inflight,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'mean_latency_ms': self.mean_latency * 1000.0 if self.mean_latency is not None else None,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
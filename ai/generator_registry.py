@@ -0,0 +1,131 @@
+import os
+import threading
+from collections import OrderedDict
+
+import torch
+
+# Registry of generators fitted by GAN.generate_and_train, keyed on the quantized
+# (difficulty, score) and the number of training epochs. The first call for a key trains a
+# generator and saves its weights; later calls for that key reuse it, so they cost one forward
+# pass instead of a full training run. Fitted generators are kept in memory (LRU, up to
+# `max_in_memory`) and on disk (LRU by file mtime, up to `max_on_disk` files).
+#
+# Values are snapped down to the grid. The default 0.05 step keeps the tier thresholds of
+# create_target_pattern (0.3, 0.7) on grid points, so a fit never uses another tier's target.
+
+DEFAULT_QUANTIZATION = 0.05
+DEFAULT_MAX_IN_MEMORY = 32
+DEFAULT_MAX_ON_DISK = 256  # ~2.3 MB per generator
+
+
+class FittedGeneratorRegistry:
+    def __init__(self, build_model, fit_model, cache_dir=None, quantization=DEFAULT_QUANTIZATION,
+                 max_in_memory=DEFAULT_MAX_IN_MEMORY, max_on_disk=DEFAULT_MAX_ON_DISK):
+        # build_model() -> an untrained module to load saved weights into
+        # fit_model(difficulty, score, num_epochs) -> a trained module
+        if quantization <= 0: raise ValueError("quantization must be positive.")
+        self.build_model = build_model
+        self.fit_model = fit_model
+        self.cache_dir = cache_dir
+        self.quantization = quantization
+        self.max_in_memory = max_in_memory
+        self.max_on_disk = max_on_disk
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.fits = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    def quantize(self, value):
+        # Snap down to the grid (the small epsilon keeps e.g. 0.7 / 0.05 from landing on 13.999...)
+        steps = int(value / self.quantization + 1e-9)
+        return min(1.0, max(0.0, round(steps * self.quantization, 6)))
+
+    def key(self, difficulty, score, num_epochs):
+        return (self.quantize(difficulty), self.quantize(score), int(num_epochs))
+
+    def _path(self, key):
+        difficulty, score, num_epochs = key
+        return os.path.join(self.cache_dir, f'generator_d{difficulty:.3f}_s{score:.3f}_e{num_epochs}.pt')
+
+    def get(self, difficulty, score, num_epochs):
+        # Returns the fitted generator for the grid point containing (difficulty, score)
+        key = self.key(difficulty, score, num_epochs)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+            model = self._load(key)
+            if model is None:
+                # Seeded from the key, so a refit after eviction gives the same generator
+                with torch.random.fork_rng():
+                    torch.manual_seed(int(round(key[0] * 1000)) * 1009 + int(round(key[1] * 1000)))
+                    model = self.fit_model(key[0], key[1], num_epochs)
+                self.fits += 1
+                self._save(key, model)
+            model.eval().requires_grad_(False)
+            self._models[key] = model
+            while len(self._models) > self.max_in_memory:
+                self._models.popitem(last=False)
+                self.evictions += 1
+            return model
+
+    def _load(self, key):
+        if not self.cache_dir: return None
+        path = self._path(key)
+        if not os.path.exists(path): return None
+        try:
+            model = self.build_model()
+            model.load_state_dict(torch.load(path, map_location='cpu', weights_only=True))
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable fitted generator {path}: {e}")
+            return None
+        os.utime(path)  # Mark as recently used for disk eviction
+        self.disk_hits += 1
+        return model
+
+    def _save(self, key, model):
+        if not self.cache_dir or self.max_on_disk <= 0: return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            tmp_path = path + '.tmp'
+            torch.save(model.state_dict(), tmp_path)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except Exception as e:
+            print(f"Warning: Could not save fitted generator to {self.cache_dir}: {e}")
+
+    def _evict_disk(self):
+        paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                 if name.startswith('generator_') and name.endswith('.pt')]
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:max(0, len(paths) - self.max_on_disk)]:
+            os.remove(path)
+            self.disk_evictions += 1
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._models.clear()
+            if disk and self.cache_dir and os.path.isdir(self.cache_dir):
+                for name in os.listdir(self.cache_dir):
+                    if name.startswith('generator_') and name.endswith('.pt'):
+                        os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_memory': len(self._models),
+                'max_in_memory': self.max_in_memory,
+                'max_on_disk': self.max_on_disk,
+                'quantization': self.quantization,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'fits': self.fits,
+                'evictions': self.evictions,
+                'disk_evictions': self.disk_evictions,
+            }
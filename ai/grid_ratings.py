@@ -0,0 +1,171 @@
+import numpy as np
+from scipy import ndimage
+
+from level_constants import GRID_ROWS, GRID_COLS, BOX_SIZE, IMAGE_WIDTH, IMAGE_HEIGHT
+from level_render import PLATFORM_THRESHOLD, add_connections
+
+# Difficulty/score ratings computed straight from 25x25 pattern grids, without rendering a PNG
+# and running it back through OpenCV. Blocks are the 4-connected groups of platform cells (the
+# rendered boxes of diagonal neighbours do not touch), so a whole (N, 25, 25) batch is labelled
+# in one scipy.ndimage.label call. The spread, cluster, regularity, spiral and symmetry metrics
+# and the weights are those of level_ratings.rate_blocks, evaluated for all levels at once.
+#
+# Ratings differ from analyze_level_pattern on the rendered image, which also counts the stars
+# of the background as blocks; they match rate_blocks on the platform blocks alone.
+
+BOX_CONTOUR_AREA = 730.5  # cv2.contourArea of one rendered box sprite
+DEFAULT_COLOR_VARIETY = 1  # Every platform uses the same sprite
+DEFAULT_TOLERANCE = 0.1
+
+# Connects cells within a level (4-neighbourhood), never across the batch axis
+BATCH_STRUCTURE = np.zeros((3, 3, 3), dtype=bool)
+BATCH_STRUCTURE[1] = ndimage.generate_binary_structure(2, 1)
+
+
+def to_grids(patterns, threshold=PLATFORM_THRESHOLD):
+    # (625,), (25, 25), (N, 625) or (N, 25, 25) patterns -> (N, 25, 25) boolean grids
+    patterns = np.asarray(patterns)
+    if patterns.dtype != bool: patterns = patterns > threshold
+    return patterns.reshape(-1, GRID_ROWS, GRID_COLS)
+
+
+def grid_blocks(grids):
+    # Blocks of a (N, 25, 25) batch as arrays of their level index and pixel x, y, w, h, area
+    labels, num_blocks = ndimage.label(grids, structure=BATCH_STRUCTURE)
+    levels, rows, cols = np.nonzero(labels)
+    order = np.argsort(labels[levels, rows, cols], kind='stable')
+    levels, rows, cols = levels[order], rows[order], cols[order]
+    cells = np.bincount(labels[levels, rows, cols], minlength=num_blocks + 1)[1:]
+    starts = np.concatenate([[0], np.cumsum(cells)[:-1]]).astype(np.intp)
+    if not num_blocks:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty, empty, np.zeros(0)
+    top, bottom = rows[starts], np.maximum.reduceat(rows, starts)
+    left, right = np.minimum.reduceat(cols, starts), np.maximum.reduceat(cols, starts)
+    return (levels[starts], left * BOX_SIZE, top * BOX_SIZE, (right - left + 1) * BOX_SIZE,
+            (bottom - top + 1) * BOX_SIZE, cells * BOX_CONTOUR_AREA)
+
+
+def _group_std(values, groups, counts, num_levels):
+    # Population std (np.std) of values per group; NaN for empty groups
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.bincount(groups, weights=values, minlength=num_levels) / counts
+        deviations = values - means[groups]
+        return np.sqrt(np.bincount(groups, weights=deviations ** 2, minlength=num_levels) / counts)
+
+
+def _sorted_diff_std(values, groups, num_levels):
+    # std of np.diff(np.sort(values)) within each group
+    order = np.lexsort((values, groups))
+    values, groups = values[order], groups[order]
+    same = groups[1:] == groups[:-1]
+    diffs, diff_groups = (values[1:] - values[:-1])[same], groups[1:][same]
+    counts = np.bincount(diff_groups, minlength=num_levels).astype(np.float64)
+    return _group_std(diffs.astype(np.float64), diff_groups, counts, num_levels)
+
+
+def _distinct_per_level(values, groups, num_levels, size):
+    seen = np.zeros((num_levels, size), dtype=bool)
+    seen[groups, values] = True
+    return seen.sum(axis=1)
+
+
+def rate_grids(patterns, render_difficulties=None, color_variety=DEFAULT_COLOR_VARIETY):
+    # (difficulties, scores) arrays for a batch of patterns, rounded like analyze_level_pattern.
+    # With render_difficulties the connector boxes render_pattern adds above difficulty 0.5 are
+    # rated too. Levels without platforms rate NaN.
+    grids = to_grids(patterns)
+    num_levels = len(grids)
+    if render_difficulties is not None:
+        connect = np.broadcast_to(np.asarray(render_difficulties) > 0.5, (num_levels,))
+        grids = np.where(connect[:, None, None], add_connections(grids), grids)
+    levels, x, y, w, h, area = grid_blocks(grids)
+    x, y = x.astype(np.float64), y.astype(np.float64)
+    num_blocks = np.bincount(levels, minlength=num_levels)
+    counts = num_blocks.astype(np.float64)
+
+    # Vertical and horizontal analysis
+    y_spread = _group_std(y, levels, counts, num_levels) / IMAGE_HEIGHT
+    x_spread = _group_std(x, levels, counts, num_levels) / IMAGE_WIDTH
+    y_clusters = _distinct_per_level((y // BOX_SIZE).astype(np.intp), levels, num_levels, GRID_ROWS)
+    x_clusters = _distinct_per_level((x // BOX_SIZE).astype(np.intp), levels, num_levels, GRID_COLS)
+
+    # Pattern complexity and spatial distribution
+    pattern_regularity = (_sorted_diff_std(y, levels, num_levels) + _sorted_diff_std(x, levels, num_levels)) / 2
+    coverage = np.bincount(levels, weights=area, minlength=num_levels) / (IMAGE_WIDTH * IMAGE_HEIGHT)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        density = np.where((x_clusters > 0) & (y_clusters > 0), num_blocks / (x_clusters * y_clusters), 0)
+
+        # Spiral: distance from the centre correlates with the angle rank (see detect_spiral_pattern)
+        center_x = np.bincount(levels, weights=x, minlength=num_levels) / counts
+        center_y = np.bincount(levels, weights=y, minlength=num_levels) / counts
+        dx, dy = x - center_x[levels], y - center_y[levels]
+        distances, angles = np.sqrt(dx ** 2 + dy ** 2), np.arctan2(dy, dx)
+        order = np.lexsort((angles, levels))
+        starts = np.concatenate([[0], np.cumsum(num_blocks)[:-1]])
+        ranks = np.arange(len(order)) - starts[levels[order]]
+        sorted_distances, sorted_levels = distances[order], levels[order]
+        rank_dev = ranks - ((counts - 1) / 2)[sorted_levels]
+        distance_dev = sorted_distances - (np.bincount(sorted_levels, weights=sorted_distances, minlength=num_levels) / counts)[sorted_levels]
+        covariance = np.bincount(sorted_levels, weights=rank_dev * distance_dev, minlength=num_levels)
+        correlation = covariance / np.sqrt(np.bincount(sorted_levels, weights=rank_dev ** 2, minlength=num_levels)
+                                           * np.bincount(sorted_levels, weights=distance_dev ** 2, minlength=num_levels))
+    is_spiral = (num_blocks >= 10) & (correlation > 0.6)
+
+    # Symmetry: similar block counts left and right of the centre line (see check_symmetry)
+    left_blocks = np.bincount(levels[x < IMAGE_WIDTH / 2], minlength=num_levels)
+    right_blocks = np.bincount(levels[x > IMAGE_WIDTH / 2], minlength=num_levels)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        has_symmetry = np.abs(left_blocks - right_blocks) / counts < 0.3
+
+    difficulty = (
+        0.25 * np.minimum(1.0, y_spread * 2.5) +
+        0.20 * np.minimum(1.0, 1 - pattern_regularity / 25) +
+        0.20 * np.minimum(1.0, density * 2.0) +
+        0.15 * np.minimum(1.0, y_clusters / 10) +
+        0.10 * np.minimum(1.0, num_blocks / 50) +
+        0.10 * min(1.0, color_variety / 5)
+    )
+    difficulty = np.where(is_spiral, np.minimum(0.999, difficulty + 0.2), difficulty)
+    difficulty = np.where(has_symmetry, np.minimum(0.999, difficulty + 0.1), difficulty)
+    difficulty = np.minimum(0.999, np.maximum(0.001, difficulty))
+
+    score = (
+        0.25 * np.minimum(1.0, num_blocks / 45) +
+        0.15 * np.minimum(1.0, x_spread) +
+        0.15 * np.minimum(1.0, y_spread) +
+        0.15 * np.minimum(1.0, coverage * 2) +
+        0.15 * np.minimum(1.0, x_clusters / 25) +
+        0.15 * min(1.0, color_variety / 4)
+    ) * 0.7 + 0.2
+    difficulty = np.where(is_spiral, np.minimum(0.999, difficulty + 0.08), difficulty)
+    score = np.where(is_spiral, np.minimum(0.999, score + 0.04), score)
+    score = np.where(has_symmetry, np.minimum(0.999, score + 0.02), score)
+
+    difficulty = np.round(np.minimum(0.999, np.maximum(0.101, difficulty)), 3)
+    score = np.round(np.minimum(0.999, np.maximum(0.101, score)), 3)
+    # Fewer than 5 blocks is the fixed minimum rating, no platforms has no rating
+    difficulty = np.where(num_blocks < 5, 0.101, difficulty)
+    score = np.where(num_blocks < 5, 0.101, score)
+    return np.where(num_blocks == 0, np.nan, difficulty), np.where(num_blocks == 0, np.nan, score)
+
+
+def rate_grid(pattern, render_difficulty=None, color_variety=DEFAULT_COLOR_VARIETY):
+    # (difficulty, score) of a single pattern
+    difficulties, scores = rate_grids(pattern, None if render_difficulty is None else [render_difficulty], color_variety)
+    return float(difficulties[0]), float(scores[0])
+
+
+def on_target(patterns, difficulty, score, tolerance=DEFAULT_TOLERANCE, render_difficulties=None):
+    # Boolean mask of the patterns whose rating is within tolerance of the target (difficulty, score);
+    # targets may be scalars or one per pattern
+    difficulties, scores = rate_grids(patterns, render_difficulties)
+    with np.errstate(invalid='ignore'):
+        return (np.abs(difficulties - difficulty) <= tolerance) & (np.abs(scores - score) <= tolerance)
+
+
+def filter_on_target(patterns, difficulty, score, tolerance=DEFAULT_TOLERANCE, render_difficulties=None):
+    # The patterns rated within tolerance of the target and their indices in the batch
+    patterns = np.asarray(patterns)
+    indices = np.flatnonzero(on_target(patterns, difficulty, score, tolerance, render_difficulties))
+    return patterns[indices], indices
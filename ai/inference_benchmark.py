@@ -0,0 +1,84 @@
+# Generator inference benchmark: eager vs compiled
+# Builds an inference-only LevelGAN per mode, compiles the generator, runs warmup batches and
+# then times forward passes at several batch sizes on the CPU. Reports build/warmup time,
+# per-batch latency (median and p95) and the largest output difference from eager mode.
+#
+# Examples:
+#   python inference_benchmark.py
+#   python inference_benchmark.py --modes none,script,compile --batch-sizes 1,32,256 --threads 4
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+
+def time_batches(runners, conditions, repeats):
+    # runners maps a name to fn(conditions). Round-robin over them so drift in machine load
+    # affects them all equally; returns per-call latencies in ms
+    samples = {name: [] for name in runners}
+    for _ in range(repeats):
+        for name, run in runners.items():
+            start = time.perf_counter()
+            run(conditions)
+            samples[name].append(time.perf_counter() - start)
+    return {name: np.array(times) * 1000 for name, times in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare eager and compiled generator latency on CPU.")
+    parser.add_argument('--modes', default='none,script', help="Comma separated: none (eager), script, compile")
+    parser.add_argument('--batch-sizes', default='1,8,32,128', help="Comma separated batch sizes")
+    parser.add_argument('--repeats', type=int, default=300, help="Timed forward passes per batch size")
+    parser.add_argument('--threads', type=int, default=1, help="torch intra-op threads (1 matches one serving worker)")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    import torch
+    from level_gan import LevelGAN
+    torch.set_num_threads(args.threads)
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+    conditions = {size: np.random.default_rng(size).random((size, 2)) for size in batch_sizes}
+
+    # One model per mode, all with the same weights (saved weights if present, else random)
+    models, results = {}, {}
+    for mode in modes:
+        level_gan = LevelGAN(inference_only=True, models=('gan',))
+        if models: level_gan.generator.load_state_dict(next(iter(models.values())).generator.state_dict())
+        start = time.perf_counter()
+        level_gan.compile_generator(mode)
+        built = time.perf_counter()
+        level_gan.warmup(batch_sizes)
+        results[mode] = {'build_s': built - start, 'warmup_s': time.perf_counter() - built, 'batches': {}}
+        models[mode] = level_gan
+
+    for size in batch_sizes:
+        outputs = {mode: level_gan.generate_raw_patterns(conditions[size]) for mode, level_gan in models.items()}
+        latencies = time_batches({mode: level_gan.generate_raw_patterns for mode, level_gan in models.items()},
+                                 conditions[size], args.repeats)
+        for mode in modes:
+            results[mode]['batches'][size] = {
+                'p50_ms': float(np.percentile(latencies[mode], 50)),
+                'p95_ms': float(np.percentile(latencies[mode], 95)),
+                'max_abs_diff': float(np.abs(outputs[mode] - outputs[modes[0]]).max()),
+            }
+
+    print(f"\n{'mode':<8} {'batch':>6} {'p50 ms':>9} {'p95 ms':>9} {'vs ' + modes[0]:>9} {'max diff':>9}")
+    for mode, result in results.items():
+        for size, stats in result['batches'].items():
+            speedup = results[modes[0]]['batches'][size]['p50_ms'] / stats['p50_ms']
+            print(f"{mode:<8} {size:>6} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {speedup:>8.2f}x {stats['max_abs_diff']:>9.1e}")
+        print(f"{mode:<8} build {result['build_s']:.2f}s, warmup {result['warmup_s']:.2f}s")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'threads': args.threads, 'repeats': args.repeats, 'modes': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
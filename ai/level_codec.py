@@ -0,0 +1,30 @@
+import numpy as np
+
+from level_constants import GRID_ROWS, GRID_COLS, PATTERN_SIZE
+
+# Compact binary encoding of level grids: the 25x25 occupancy grid is stored row-major,
+# one bit per cell, most significant bit first (625 bits -> 79 bytes, last 7 bits zero).
+
+PACKED_SIZE = (PATTERN_SIZE + 7) // 8
+BITSET_MEDIA_TYPE = 'application/x-level-bitset'
+
+
+def pack_patterns(patterns, threshold=0.5):
+    # (N, 625) or (N, 25, 25) patterns -> (N, 79) uint8
+    grids = np.asarray(patterns).reshape(-1, PATTERN_SIZE) > threshold
+    return np.packbits(grids, axis=1)
+
+
+def unpack_patterns(packed):
+    # (N, 79) uint8 -> (N, 625) float32 patterns of 0/1
+    packed = np.asarray(packed, dtype=np.uint8).reshape(-1, PACKED_SIZE)
+    return np.unpackbits(packed, axis=1, count=PATTERN_SIZE).astype(np.float32)
+
+
+def pack_grid(pattern, threshold=0.5):
+    return pack_patterns(pattern, threshold)[0].tobytes()
+
+
+def unpack_grid(data):
+    if len(data) != PACKED_SIZE: raise ValueError(f"Packed grid must be {PACKED_SIZE} bytes, got {len(data)}.")
+    return unpack_patterns(np.frombuffer(data, dtype=np.uint8))[0].reshape(GRID_ROWS, GRID_COLS)
@@ -0,0 +1,11 @@
+# Game constraints shared by the model, the renderer and the codecs.
+# Kept free of heavy imports so the server and tools can use them without loading torch.
+
+IMAGE_WIDTH = 800
+IMAGE_HEIGHT = 800
+BOX_SIZE = 32
+GRID_COLS = IMAGE_WIDTH // BOX_SIZE
+GRID_ROWS = IMAGE_HEIGHT // BOX_SIZE
+PATTERN_SIZE = GRID_ROWS * GRID_COLS
+SAFE_ZONE_HEIGHT_PX = 228
+SAFE_ZONE_ROWS = SAFE_ZONE_HEIGHT_PX // BOX_SIZE
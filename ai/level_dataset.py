@@ -0,0 +1,139 @@
+# Bit-packed, memory-mapped training corpus
+# A dataset file is a flat array of fixed-size little-endian records, one per level:
+#   79 bytes  pattern, 25x25 cells packed one bit per cell (see level_codec)
+#    8 bytes  condition, float32 difficulty and score
+# 87 bytes per level instead of 2.5 KB as float32, no header, so the level count is the file
+# size / 87 and new levels can be appended. Training reads it through a memory map and unpacks
+# one batch at a time, so memory use does not grow with the corpus.
+#
+# Convert game_levels/ PNGs:
+#   python level_dataset.py game_levels level_archive/levels.bin
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from level_codec import pack_patterns, unpack_patterns, PACKED_SIZE
+
+RECORD_DTYPE = np.dtype([('pattern', np.uint8, (PACKED_SIZE,)), ('condition', '<f4', (2,))])
+CONVERT_CHUNK_SIZE = 1024
+
+
+def append_records(path, patterns, conditions):
+    # Appends (N, 625) patterns and their (N, 2) conditions to a dataset file
+    records = np.empty(len(patterns), dtype=RECORD_DTYPE)
+    records['pattern'] = pack_patterns(patterns)
+    records['condition'] = np.asarray(conditions, dtype=np.float32).reshape(-1, 2)
+    with open(path, 'ab') as f:
+        f.write(records.tobytes())
+    return len(records)
+
+
+def write_dataset(path, patterns, conditions):
+    # Writes a new dataset file atomically
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    open(tmp_path, 'wb').close()
+    append_records(tmp_path, patterns, conditions)
+    os.replace(tmp_path, path)
+
+
+def open_dataset(path):
+    # Read-only memory map of the records; nothing is read until rows are accessed
+    size = os.path.getsize(path)
+    if size % RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} is not a level dataset: {size} bytes is not a multiple of {RECORD_DTYPE.itemsize}.")
+    if size == 0: return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r')
+
+
+class PackedLevelDataset(torch.utils.data.Dataset):
+    # dataset[i] is one (condition, pattern) pair; dataset[[i, j, ...]] (as issued by batch_loader)
+    # unpacks the whole batch in one go. Patterns are scaled to [-1, 1] like the generator's tanh output.
+    def __init__(self, path):
+        self.path = path
+        self._records = None
+        self._length = len(open_dataset(path))
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def records(self):
+        # Opened lazily so each DataLoader worker maps the file itself
+        if self._records is None: self._records = open_dataset(self.path)
+        return self._records
+
+    def __getstate__(self):
+        return dict(self.__dict__, _records=None)
+
+    def __getitem__(self, index):
+        if np.ndim(index) == 0:
+            conditions, patterns = self[[index]]
+            return conditions[0], patterns[0]
+        index = np.asarray(index, dtype=np.int64)
+        order = np.argsort(index)  # Read rows in file order, then restore the requested order
+        rows = self.records[index[order]][np.argsort(order)]
+        conditions = torch.from_numpy(np.array(rows['condition'], dtype=np.float32, order='C'))
+        patterns = torch.from_numpy(unpack_patterns(rows['pattern'])) * 2 - 1
+        return conditions, patterns
+
+
+def batch_loader(dataset, batch_size, shuffle=True, drop_last=True, sampler=None, num_workers=0):
+    # DataLoader yielding (conditions, patterns) batches through the dataset's batched indexing
+    if sampler is None:
+        sampler = torch.utils.data.RandomSampler(dataset) if shuffle else torch.utils.data.SequentialSampler(dataset)
+    batch_sampler = torch.utils.data.BatchSampler(sampler, batch_size, drop_last)
+    return torch.utils.data.DataLoader(dataset, batch_size=None, sampler=batch_sampler, num_workers=num_workers)
+
+
+def convert_levels(data_folder, out_path, workers=None, chunk_size=CONVERT_CHUNK_SIZE):
+    # game_levels-style folder of level_d{difficulty}_s{score}.png -> dataset file. Images are decoded
+    # chunk by chunk (in parallel with workers > 1) and appended, so memory stays flat.
+    # Like LevelGAN's pattern history, unreadable images and images without platforms are skipped.
+    from level_gan import parse_level_params
+    from pattern_cache import pattern_from_file
+    filenames = sorted(f for f in os.listdir(data_folder) if f.lower().endswith('.png') and f.lower().startswith('level_'))
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp_path = out_path + '.tmp'
+    open(tmp_path, 'wb').close()
+    written = 0
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) if workers > 1 else None
+    try:
+        for start in range(0, len(filenames), chunk_size):
+            chunk = filenames[start:start + chunk_size]
+            paths = [os.path.join(data_folder, filename) for filename in chunk]
+            patterns = list(pool.map(pattern_from_file, paths, chunksize=16)) if pool else [pattern_from_file(path) for path in paths]
+            kept = [(filename, pattern) for filename, pattern in zip(chunk, patterns) if pattern is not None and pattern.sum() > 0]
+            if kept:
+                written += append_records(tmp_path, np.stack([pattern for _, pattern in kept]),
+                                          [parse_level_params(filename) for filename, _ in kept])
+            print(f"{min(start + chunk_size, len(filenames))}/{len(filenames)} images converted")
+    finally:
+        if pool is not None: pool.shutdown()
+    os.replace(tmp_path, out_path)
+    print(f"Wrote {written} levels ({written * RECORD_DTYPE.itemsize} bytes) to {out_path}, "
+          f"skipped {len(filenames) - written} without platforms")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert level PNGs to a bit-packed training dataset.")
+    parser.add_argument('data_folder', help="Folder of level_d{difficulty}_s{score}.png images")
+    parser.add_argument('out', help="Dataset file to write")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=CONVERT_CHUNK_SIZE, help="Images decoded per chunk")
+    args = parser.parse_args()
+    convert_levels(args.data_folder, args.out, workers=args.workers, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,19 @@
 import os
+import sys
+import copy
+import io
+import hashlib
+import json
+import time
+import warnings
 import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
 import cv2
-from scipy.ndimage import binary_opening
-from torch.nn import LSTM
+
+# Game Constraints
+from level_constants import IMAGE_WIDTH, IMAGE_HEIGHT, BOX_SIZE, GRID_COLS, GRID_ROWS, PATTERN_SIZE, SAFE_ZONE_ROWS
 
 # Configuration
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -13,16 +21,8 @@ ARCHIVE_DIR = os.path.join(BASE_DIR, 'level_archive')
 MODEL_SAVE_DIR = os.path.join(BASE_DIR, 'models')
 TRAINING_DATA_DIR = os.path.join(BASE_DIR, "game_levels")
 GENERATED_LEVELS_DIR = os.path.join(BASE_DIR, "generated_levels")
-
-# Game Constraints
-IMAGE_WIDTH = 800
-IMAGE_HEIGHT = 800
-BOX_SIZE = 32
-GRID_COLS = IMAGE_WIDTH // BOX_SIZE
-GRID_ROWS = IMAGE_HEIGHT // BOX_SIZE
-PATTERN_SIZE = GRID_ROWS * GRID_COLS
-SAFE_ZONE_HEIGHT_PX = 228
-SAFE_ZONE_ROWS = SAFE_ZONE_HEIGHT_PX // BOX_SIZE
+TRAINING_CHECKPOINT_NAME = 'training_checkpoint.pt'
+TRAINING_STATS_NAME = 'training_stats.jsonl'
 
 # Neural Network Models
 class Generator(nn.Module):
@@ -68,10 +68,227 @@ class LevelLSTM(nn.Module):
                   weight.new(self.num_layers, batch_size, self.hidden_size).zero_())
         return hidden
 
+def parse_level_params(filename):
+    # level_d{difficulty}_s{score}.png -> (difficulty, score)
+    parts = filename.split('_')
+    try:
+        difficulty = float(parts[1][1:])
+        score = float(parts[2][1:-4])
+    except (IndexError, ValueError):
+        print(f"Warning: Could not parse params from '{filename}'. Defaulting to 0.5, 0.5.")
+        difficulty, score = 0.5, 0.5
+    return difficulty, score
+
+# Image -> pattern conversion
+PLATFORM_BLOCK_MEAN = 60  # A cell is a platform when its thresholded block averages above this
+
+def binarize_level_image(img):
+    # BGR or grayscale image, or a stack of them, -> 0/255 binary at IMAGE_HEIGHT x IMAGE_WIDTH
+    if img.ndim == 4 or (img.ndim == 3 and img.shape[-1] != 3):
+        return np.stack([binarize_level_image(single) for single in img])
+    if img.shape[0] != IMAGE_HEIGHT or img.shape[1] != IMAGE_WIDTH:
+        img = cv2.resize(img, (IMAGE_WIDTH, IMAGE_HEIGHT), interpolation=cv2.INTER_NEAREST)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+    return binary
+
+def binary_to_patterns(binary, grid_rows=GRID_ROWS, grid_cols=GRID_COLS, box_size=BOX_SIZE):
+    # (N, H, W) binary images -> (N, rows * cols) patterns by block reduction; an integer
+    # block sum is compared so the result matches a per-block np.mean exactly
+    count = binary.shape[0]
+    blocks = binary[:, :grid_rows * box_size, :grid_cols * box_size].reshape(count, grid_rows, box_size, grid_cols, box_size)
+    block_sums = blocks.sum(axis=(2, 4), dtype=np.int64)
+    return (block_sums > PLATFORM_BLOCK_MEAN * box_size * box_size).reshape(count, grid_rows * grid_cols).astype(np.float64)
+
+# Batched post-processing
+# Levels are built per difficulty tier on a (B, 25, 25) grid with slice assignment and
+# precomputed coordinate tables. Every level consumes a fixed-size row of uniforms, drawn
+# in bulk, so a seeded level comes out the same whatever batch it is generated in.
+EASY_PLATFORM_LENGTH, EASY_GAP = 6, 2
+EASY_HEIGHTS = np.array([GRID_ROWS - SAFE_ZONE_ROWS - 5, GRID_ROWS - SAFE_ZONE_ROWS - 8, GRID_ROWS - SAFE_ZONE_ROWS - 11])
+EASY_STARTS = np.arange(2, GRID_COLS - EASY_PLATFORM_LENGTH, EASY_PLATFORM_LENGTH + EASY_GAP)
+MEDIUM_MAX_STEPS = len(range(2, GRID_COLS - 4, 6))  # Shortest step is a 4-wide platform plus a 2-cell gap
+SPIRAL_ANGLES = np.arange(0, 6 * np.pi, 0.3)
+SPIRAL_PLATFORM_LENGTH = 3
+FILL_MAX_PLATFORMS = 15 + 10 + 15  # Largest possible minimum platform count
+PLAYABLE_ROWS = GRID_ROWS - SAFE_ZONE_ROWS
+
+def _build_spiral_tables():
+    # Spiral platforms are fixed; connectors (one above or below each spiral point) are optional
+    center_x, center_y = GRID_COLS // 2, PLAYABLE_ROWS // 2
+    spiral = np.zeros((GRID_ROWS, GRID_COLS), dtype=bool)
+    connectors = np.zeros((len(SPIRAL_ANGLES), 2, GRID_ROWS, GRID_COLS), dtype=bool)
+    for i, angle in enumerate(SPIRAL_ANGLES):
+        current_radius = 8 + angle
+        x = int(center_x + current_radius * np.cos(angle))
+        y = int(center_y + current_radius * np.sin(angle))
+        if 1 < y < PLAYABLE_ROWS and 1 < x < GRID_COLS - SPIRAL_PLATFORM_LENGTH:
+            spiral[y, x:x + SPIRAL_PLATFORM_LENGTH] = True
+        for j, offset in enumerate((-2, 2)):
+            connect_y = y + offset
+            if 1 < connect_y < PLAYABLE_ROWS:
+                connectors[i, j, connect_y, max(x - 2, 2):max(x + 3, 2)] = True
+    return spiral, connectors.reshape(len(SPIRAL_ANGLES), 2, PATTERN_SIZE).astype(np.float32)
+
+SPIRAL_MASK, SPIRAL_CONNECTORS = _build_spiral_tables()
+
+# Column layout of each level's row of uniforms: the tier section is shared (a level is in one tier)
+TIER_DRAWS = max(len(EASY_STARTS), 4 * MEDIUM_MAX_STEPS, 2 * len(SPIRAL_ANGLES))
+FILL_OFFSET = TIER_DRAWS
+DRAWS_PER_LEVEL = FILL_OFFSET + 2 * FILL_MAX_PLATFORMS
+
+def _uniform_draws(count, seeds=None, rng=None):
+    if seeds is None or all(seed is None for seed in seeds):
+        return (rng if rng is not None else np.random.default_rng()).random((count, DRAWS_PER_LEVEL))
+    return np.stack([np.random.default_rng(seed).random(DRAWS_PER_LEVEL) for seed in seeds])
+
+def _randint(u, low, high):
+    return low + np.floor(u * (high - low)).astype(np.int64)
+
+def _fill_rows(grid, levels, rows, starts, stops):
+    # grid[levels[i], rows[i], starts[i]:stops[i]] = 1 for every i
+    cols = np.arange(GRID_COLS)
+    spans = (cols >= starts[:, None]) & (cols < stops[:, None])
+    np.maximum.at(grid, (levels, rows), spans.astype(grid.dtype))
+
+def _easy_levels(grid, idx, u):
+    heights = EASY_HEIGHTS[_randint(u[:, :len(EASY_STARTS)], 0, 3)]
+    for k, start in enumerate(EASY_STARTS):
+        grid[idx, heights[:, k], start:min(start + EASY_PLATFORM_LENGTH, GRID_COLS)] = 1.0
+
+def _medium_levels(grid, idx, u, scores):
+    n = len(idx)
+    x = np.full(n, 2)
+    y = np.full(n, PLAYABLE_ROWS - 5)
+    direction = np.ones(n, dtype=np.int64)
+    for step in range(MEDIUM_MAX_STEPS):
+        draws = u[:, 4 * step:4 * step + 4]
+        active = x < GRID_COLS - 4
+        if not active.any(): break
+        length = _randint(draws[:, 0], 4, 6)
+        _fill_rows(grid, idx[active], y[active], x[active], np.minimum(x + length, GRID_COLS)[active])
+        branch_y = y + np.where(draws[:, 2] < 0.5, -2, 2)
+        branch = active & (scores > 0.4) & (draws[:, 1] < 0.6) & (branch_y > 1) & (branch_y < PLAYABLE_ROWS)
+        _fill_rows(grid, idx[branch], branch_y[branch], (x + 2)[branch], np.minimum(x + 4, GRID_COLS)[branch])
+        x = np.where(active, x + length + 2, x)
+        y = np.where(active, y + direction * _randint(draws[:, 3], 2, 4), y)
+        turn = active & ((y <= 2) | (y >= PLAYABLE_ROWS - 2))
+        direction = np.where(turn, -direction, direction)
+        y = np.where(turn, y + direction * 2, y)
+
+def _hard_levels(grid, idx, u, scores):
+    n = len(idx)
+    angles = len(SPIRAL_ANGLES)
+    grid[idx] = np.maximum(grid[idx], SPIRAL_MASK)
+    take = (scores[:, None] > 0.6) & (u[:, :angles] < 0.3)
+    below = u[:, angles:2 * angles] >= 0.5
+    connectors = (take & ~below).astype(np.float32) @ SPIRAL_CONNECTORS[:, 0] + (take & below).astype(np.float32) @ SPIRAL_CONNECTORS[:, 1]
+    grid[idx] = np.maximum(grid[idx], (connectors > 0).reshape(n, GRID_ROWS, GRID_COLS))
+
+def post_process_patterns(patterns, difficulties, scores, seeds=None, rng=None):
+    # (B, 625) raw patterns -> (B, 625) playable layouts. seeds gives each level its own
+    # reproducible stream; otherwise all draws come from rng (or fresh entropy).
+    difficulties = np.asarray(difficulties, dtype=np.float64).reshape(-1)
+    scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+    count = len(difficulties)
+    if np.asarray(patterns).reshape(count, -1).shape[1] != PATTERN_SIZE:
+        raise ValueError(f"Patterns must have {PATTERN_SIZE} cells.")
+    u = _uniform_draws(count, seeds, rng)
+    grid = np.zeros((count, GRID_ROWS, GRID_COLS))
+
+    easy = np.flatnonzero(difficulties < 0.3)
+    medium = np.flatnonzero((difficulties >= 0.3) & (difficulties < 0.7))
+    hard = np.flatnonzero(difficulties >= 0.7)
+    if len(easy): _easy_levels(grid, easy, u[easy])
+    if len(medium): _medium_levels(grid, medium, u[medium], scores[medium])
+    if len(hard): _hard_levels(grid, hard, u[hard], scores[hard])
+
+    # Ensure minimum number of platforms: drop 3-wide platforms at random positions
+    min_platforms = np.floor(15 + difficulties * 10 + scores * 15)
+    needed = np.maximum(min_platforms - grid.sum(axis=(1, 2)), 0).astype(np.int64)
+    fill = u[:, FILL_OFFSET:FILL_OFFSET + 2 * FILL_MAX_PLATFORMS].reshape(count, FILL_MAX_PLATFORMS, 2)
+    slots = np.arange(FILL_MAX_PLATFORMS)[None, :] < needed[:, None]
+    levels, slot = np.nonzero(slots)
+    fill_x = _randint(fill[levels, slot, 0], 2, GRID_COLS - 4)
+    fill_y = _randint(fill[levels, slot, 1], 2, PLAYABLE_ROWS - 1)
+    for dx in range(3):
+        grid[levels, fill_y, fill_x + dx] = 1.0
+
+    # Clear safe zone and top row
+    grid[:, PLAYABLE_ROWS:, :] = 0.0
+    grid[:, 0:1, :] = 0.0
+    return grid.reshape(count, PATTERN_SIZE)
+
 # Main LevelGAN Class
+def resident_memory_bytes():
+    # Current RSS of this process (Linux /proc), falling back to the peak RSS elsewhere
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+def load_checkpoint(path, device='cpu'):
+    # Memory-mapped, weights-only load: tensors are paged in from the file on use rather than read
+    # through an intermediate buffer, and no pickled code is executed
+    try:
+        return torch.load(path, map_location=device, mmap=True, weights_only=True)
+    except TypeError:  # torch < 2.1 has no mmap argument
+        return torch.load(path, map_location=device, weights_only=True)
+
+# Models accepted by generate_level(use_model=...). The *_int8 variants run the same weights with
+# the Linear and LSTM layers dynamically quantized to int8 (CPU only, built on first use).
+QUANTIZED_SUFFIX = '_int8'
+MODEL_CHOICES = ('gan', 'lstm', 'gan' + QUANTIZED_SUFFIX, 'lstm' + QUANTIZED_SUFFIX)
+
+def base_model(use_model):
+    return use_model[:-len(QUANTIZED_SUFFIX)] if use_model.endswith(QUANTIZED_SUFFIX) else use_model
+
+def quantize_model(model):
+    # Dynamic int8 quantization of a CPU copy: weights are stored as int8, activations are quantized
+    # per batch. The Generator's BatchNorm layers are folded into the preceding Linear layers first.
+    model = copy.deepcopy(model).cpu().eval()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # torch.ao.quantization deprecation notices
+        if isinstance(model, Generator):
+            model = torch.ao.quantization.fuse_modules(model, [['main.2', 'main.3'], ['main.5', 'main.6']])
+        return torch.ao.quantization.quantize_dynamic(model, {nn.Linear, nn.LSTM}, dtype=torch.qint8)
+
+def serialized_size(model):
+    # Bytes of the model's saved state_dict; unlike parameters() this also counts packed int8 weights
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
 class LevelGAN:
-    def __init__(self, lr_g=0.0002, lr_d=0.0002, lr_lstm=0.001, betas=(0.5, 0.999)):
+    def __init__(self, lr_g=0.0002, lr_d=0.0002, lr_lstm=0.001, betas=(0.5, 0.999), inference_only=False, models=('gan', 'lstm'),
+                 load_pattern_history=True):
+        # inference_only builds just the networks named in `models` (see MODEL_CHOICES), loads their
+        # saved weights and puts them in eval mode; the discriminator, optimizers, losses and the
+        # training corpus are skipped, so serving processes start faster and stay smaller.
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.inference_only = inference_only
+        self._model_versions = {}
+        self._compiled_generator = None
+        self._quantized = {}
+        if inference_only:
+            if not models or set(models) - set(MODEL_CHOICES): raise ValueError(f"Choose from {', '.join(MODEL_CHOICES)}.")
+            bases = {base_model(use_model) for use_model in models}
+            self.generator = Generator(output_dim=PATTERN_SIZE).to(self.device) if 'gan' in bases else None
+            self.lstm = LevelLSTM(output_size=PATTERN_SIZE).to(self.device) if 'lstm' in bases else None
+            self.discriminator = None
+            self.g_optimizer = self.d_optimizer = self.lstm_optimizer = None
+            self.adversarial_loss = self.pattern_loss = None
+            self.pattern_history = []
+            self.load_models()
+            for model in (self.generator, self.lstm):
+                if model is not None: model.eval().requires_grad_(False)
+            footprint = self.memory_footprint()
+            print(f"Inference-only LevelGAN ({', '.join(models)}): {footprint['parameter_bytes'] / 2**20:.1f} MiB weights, "
+                  f"{footprint['rss_bytes'] / 2**20:.1f} MiB RSS")
+            return
         self.generator = Generator(output_dim=PATTERN_SIZE).to(self.device)
         self.discriminator = Discriminator(input_dim=PATTERN_SIZE).to(self.device)
         self.lstm = LevelLSTM(output_size=PATTERN_SIZE).to(self.device)
@@ -83,106 +300,224 @@ class LevelGAN:
         os.makedirs(ARCHIVE_DIR, exist_ok=True)
         os.makedirs(MODEL_SAVE_DIR, exist_ok=True)
         os.makedirs(GENERATED_LEVELS_DIR, exist_ok=True)
-        self.pattern_history = self._load_pattern_history(TRAINING_DATA_DIR)
-        print(f"Loaded {len(self.pattern_history)} patterns from {TRAINING_DATA_DIR}")
+        # Training from a packed dataset file (train(dataset_path=...)) does not need the decoded images
+        self.pattern_history = self._load_pattern_history(TRAINING_DATA_DIR) if load_pattern_history else []
+        if load_pattern_history: print(f"Loaded {len(self.pattern_history)} patterns from {TRAINING_DATA_DIR}")
+
+    def loaded_models(self):
+        return [name for name, model in (('gan', self.generator), ('lstm', self.lstm)) if model is not None]
+
+    def memory_footprint(self):
+        # Bytes held by each network's parameters and buffers, plus the process RSS
+        footprint = {'models': {}, 'parameter_bytes': 0}
+        for name, model in (('generator', self.generator), ('discriminator', self.discriminator), ('lstm', self.lstm)):
+            if model is None: continue
+            size = sum(t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers()))
+            footprint['models'][name] = size
+            footprint['parameter_bytes'] += size
+        for use_model, model in self._quantized.items():
+            footprint['models'][use_model] = serialized_size(model)
+            footprint['parameter_bytes'] += footprint['models'][use_model]
+        footprint['rss_bytes'] = resident_memory_bytes()
+        return footprint
 
     def _load_pattern_history(self, data_folder):
+        # Decoded patterns come from the on-disk pattern cache; only new or changed images are processed
+        from pattern_cache import load_patterns, CACHE_FILENAME
         patterns = []
         if not os.path.exists(data_folder): return patterns
-        for filename in os.listdir(data_folder):
-            if filename.lower().endswith('.png') and filename.lower().startswith('level_'):
-                img_path = os.path.join(data_folder, filename)
-                try:
-                    difficulty, score = self.parse_level_params(filename)
-                    pattern = self.image_to_pattern(img_path)
-                    if pattern.size != PATTERN_SIZE: continue
-                    if np.sum(pattern) > 0:
-                        patterns.append({'pattern': pattern, 'difficulty': difficulty, 'score': score, 'filename': filename})
-                except Exception as e: print(f"Error processing file {filename}: {e}")
+        filenames = sorted(f for f in os.listdir(data_folder) if f.lower().endswith('.png') and f.lower().startswith('level_'))
+        try:
+            cached = load_patterns(data_folder, filenames, os.path.join(ARCHIVE_DIR, CACHE_FILENAME))
+        except Exception as e:
+            print(f"Error loading pattern cache: {e}")
+            cached = {filename: self.image_to_pattern(os.path.join(data_folder, filename)) for filename in filenames}
+        for filename in filenames:
+            try:
+                difficulty, score = self.parse_level_params(filename)
+                pattern = cached[filename]
+                if pattern.size != PATTERN_SIZE: continue
+                if np.sum(pattern) > 0:
+                    patterns.append({'pattern': pattern, 'difficulty': difficulty, 'score': score, 'filename': filename})
+            except Exception as e: print(f"Error processing file {filename}: {e}")
         return patterns
 
     def parse_level_params(self, filename):
-        parts = filename.split('_')
-        try:
-            difficulty = float(parts[1][1:])
-            score = float(parts[2][1:-4])
-        except (IndexError, ValueError):
-            print(f"Warning: Could not parse params from '{filename}'. Defaulting to 0.5, 0.5.")
-            difficulty, score = 0.5, 0.5
-        return difficulty, score
+        return parse_level_params(filename)
 
     def image_to_pattern(self, img_path, grid_rows=GRID_ROWS, grid_cols=GRID_COLS, box_size=BOX_SIZE):
         img = cv2.imread(img_path)
         if img is None:
             print(f"Warning: Could not read image {img_path}. Returning empty pattern.")
             return np.zeros(grid_rows * grid_cols)
-        if img.shape[0] != IMAGE_HEIGHT or img.shape[1] != IMAGE_WIDTH:
-            img = cv2.resize(img, (IMAGE_WIDTH, IMAGE_HEIGHT), interpolation=cv2.INTER_NEAREST)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-        pattern = np.zeros(grid_rows * grid_cols)
-        img_height, img_width = binary.shape[:2]
-        for y in range(grid_rows):
-            for x in range(grid_cols):
-                y_start, y_end = y * box_size, (y + 1) * box_size
-                x_start, x_end = x * box_size, (x + 1) * box_size
-                if y_end <= img_height and x_end <= img_width:
-                    block = binary[y_start:y_end, x_start:x_end]
-                    if block.size > 0 and np.mean(block) > 60:
-                        pattern[y * grid_cols + x] = 1
+        pattern = binary_to_patterns(binarize_level_image(img)[None], grid_rows, grid_cols, box_size)[0]
         if np.sum(pattern) == 0:
              print(f"Warning: No platforms detected in {img_path} after processing.")
         return pattern
 
-    def train(self, epochs=100, batch_size=16, use_gan=True, use_lstm=True):
-        if not self.pattern_history: print("Error: Cannot train without loaded pattern history."); return
+    def images_to_patterns(self, images, grid_rows=GRID_ROWS, grid_cols=GRID_COLS, box_size=BOX_SIZE):
+        # Paths, a list of BGR/grayscale images or an (N, H, W[, 3]) stack -> (N, rows * cols) patterns.
+        # Unreadable paths give empty patterns, like image_to_pattern.
+        if isinstance(images, np.ndarray) and images.ndim in (3, 4) and images.dtype == np.uint8 and images.shape[1:3] == (IMAGE_HEIGHT, IMAGE_WIDTH):
+            binary = binarize_level_image(images)
+        else:
+            binary = np.zeros((len(images), IMAGE_HEIGHT, IMAGE_WIDTH), dtype=np.uint8)
+            for i, image in enumerate(images):
+                img = cv2.imread(image) if isinstance(image, str) else image
+                if img is None:
+                    print(f"Warning: Could not read image {image}. Returning empty pattern.")
+                    continue
+                binary[i] = binarize_level_image(img)
+        return binary_to_patterns(binary, grid_rows, grid_cols, box_size)
+
+    def train(self, epochs=100, batch_size=16, use_gan=True, use_lstm=True, checkpoint_every=10, resume=False,
+              checkpoint_path=None, stats_path=None, dataset_path=None):
+        # Checkpoints (weights, optimizer state, epoch) are written atomically every `checkpoint_every`
+        # epochs and after the last one; resume=True continues from the checkpoint. Per-epoch throughput
+        # and D/G/LSTM phase times are appended to stats_path as JSON lines. Under torch.distributed
+        # (see train_distributed) each process trains on its shard and gradients are all-reduced.
+        # dataset_path trains from a bit-packed level_dataset file, unpacked batch by batch, instead of
+        # the in-memory pattern history.
+        if self.inference_only: print("Error: Cannot train an inference-only LevelGAN."); return
+        if checkpoint_every < 1: raise ValueError("checkpoint_every must be at least 1.")
+        self._compiled_generator, self._quantized = None, {}  # Rebuilt from the new weights on next use
+        if dataset_path is None and not self.pattern_history: print("Error: Cannot train without loaded pattern history."); return
         if not use_gan and not use_lstm: print("Warning: Neither GAN nor LSTM training selected."); return
-        print(f"Starting training for {epochs} epochs...")
-        patterns_np = np.array([d['pattern'] for d in self.pattern_history], dtype=np.float32)
-        conditions = torch.FloatTensor([[d['difficulty'], d['score']] for d in self.pattern_history]).to(self.device)
-        real_patterns = torch.from_numpy(patterns_np).to(self.device)
-        real_patterns = (real_patterns * 2) - 1
-        data_loader = torch.utils.data.DataLoader(torch.utils.data.TensorDataset(conditions, real_patterns), batch_size=batch_size, shuffle=True, drop_last=True)
-
-        for epoch in range(epochs):
-            g_epoch_loss, d_epoch_loss, lstm_epoch_loss, num_batches = 0.0, 0.0, 0.0, 0
+        checkpoint_path = checkpoint_path or os.path.join(MODEL_SAVE_DIR, TRAINING_CHECKPOINT_NAME)
+        stats_path = stats_path or os.path.join(MODEL_SAVE_DIR, TRAINING_STATS_NAME)
+        distributed = torch.distributed.is_available() and torch.distributed.is_initialized()
+        rank, world_size = (torch.distributed.get_rank(), torch.distributed.get_world_size()) if distributed else (0, 1)
+
+        start_epoch = 0
+        if resume:
+            start_epoch = self.load_training_checkpoint(checkpoint_path)
+            if start_epoch >= epochs: print(f"Checkpoint is already at epoch {start_epoch}, nothing to do."); return
+        print(f"Starting training for {epochs} epochs" + (f" from epoch {start_epoch + 1}" if start_epoch else "") +
+              (f" (rank {rank} of {world_size})" if distributed else "") + "...")
+        if dataset_path is not None:
+            from level_dataset import PackedLevelDataset, batch_loader
+            dataset = PackedLevelDataset(dataset_path)
+            sampler = torch.utils.data.distributed.DistributedSampler(dataset, drop_last=True) if distributed else None
+            data_loader = batch_loader(dataset, batch_size, shuffle=True, drop_last=True, sampler=sampler)
+            print(f"Training on {len(dataset)} levels from {dataset_path}")
+        else:
+            patterns_np = np.array([d['pattern'] for d in self.pattern_history], dtype=np.float32)
+            conditions = torch.FloatTensor([[d['difficulty'], d['score']] for d in self.pattern_history]).to(self.device)
+            real_patterns = torch.from_numpy(patterns_np).to(self.device)
+            real_patterns = (real_patterns * 2) - 1
+            dataset = torch.utils.data.TensorDataset(conditions, real_patterns)
+            sampler = torch.utils.data.distributed.DistributedSampler(dataset, drop_last=True) if distributed else None
+            data_loader = torch.utils.data.DataLoader(dataset, batch_size=batch_size, shuffle=sampler is None, sampler=sampler, drop_last=True)
+
+        generator, discriminator, lstm = self.generator, self.discriminator, self.lstm
+        if distributed:
+            from torch.nn.parallel import DistributedDataParallel
+            if use_gan: generator, discriminator = DistributedDataParallel(generator), DistributedDataParallel(discriminator)
+            if use_lstm: lstm = DistributedDataParallel(lstm)
+
+        for epoch in range(start_epoch, epochs):
+            if sampler is not None: sampler.set_epoch(epoch)
+            g_epoch_loss, d_epoch_loss, lstm_epoch_loss, num_batches, samples = 0.0, 0.0, 0.0, 0, 0
+            phases = {'data': 0.0, 'd_step': 0.0, 'g_step': 0.0, 'lstm_step': 0.0}
+            epoch_start = phase_start = time.perf_counter()
             for i, (cond_batch, real_batch) in enumerate(data_loader):
-                current_batch_size = real_batch.size(0); num_batches += 1
+                cond_batch, real_batch = cond_batch.to(self.device), real_batch.to(self.device)
+                now = time.perf_counter(); phases['data'] += now - phase_start; phase_start = now
+                current_batch_size = real_batch.size(0); num_batches += 1; samples += current_batch_size
                 if use_gan:
-                    self.generator.train(); self.discriminator.train()
+                    generator.train(); discriminator.train()
                     label_real = torch.full((current_batch_size, 1), 0.9, device=self.device)
                     label_fake = torch.full((current_batch_size, 1), 0.1, device=self.device)
-                    # Train D
+                    # Train D on real and fake patterns in one forward pass. The fakes need no graph here;
+                    # BatchNorm still updates its running stats, as it does for the G step's fakes below
                     self.d_optimizer.zero_grad()
-                    d_real_output = self.discriminator(real_batch)
-                    d_real_loss = self.adversarial_loss(d_real_output, label_real)
-                    fake_patterns = self.generator(cond_batch)
-                    d_fake_output = self.discriminator(fake_patterns.detach())
-                    d_fake_loss = self.adversarial_loss(d_fake_output, label_fake)
+                    with torch.no_grad():
+                        fake_patterns = generator(cond_batch)
+                    d_output = discriminator(torch.cat([real_batch, fake_patterns]))
+                    d_real_loss = self.adversarial_loss(d_output[:current_batch_size], label_real)
+                    d_fake_loss = self.adversarial_loss(d_output[current_batch_size:], label_fake)
                     d_loss = (d_real_loss + d_fake_loss) / 2
                     d_loss.backward(); self.d_optimizer.step(); d_epoch_loss += d_loss.item()
-                    # Train G
+                    now = time.perf_counter(); phases['d_step'] += now - phase_start; phase_start = now
+                    # Train G on freshly generated fakes. The unwrapped discriminator is used so its
+                    # gradients from this pass are not all-reduced
                     self.g_optimizer.zero_grad()
-                    fake_patterns_g = self.generator(cond_batch)
-                    g_output = self.discriminator(fake_patterns_g)
+                    g_output = self.discriminator(generator(cond_batch))
                     g_loss = self.adversarial_loss(g_output, torch.ones_like(g_output))
                     total_g_loss = g_loss
                     total_g_loss.backward(); self.g_optimizer.step(); g_epoch_loss += total_g_loss.item()
+                    now = time.perf_counter(); phases['g_step'] += now - phase_start; phase_start = now
                 if use_lstm:
-                    self.lstm.train(); self.lstm_optimizer.zero_grad()
+                    lstm.train(); self.lstm_optimizer.zero_grad()
                     lstm_input = cond_batch.unsqueeze(1)
                     hidden = self.lstm.init_hidden(current_batch_size); hidden = (hidden[0].to(self.device), hidden[1].to(self.device))
-                    lstm_output, _ = self.lstm(lstm_input, hidden)
+                    lstm_output, _ = lstm(lstm_input, hidden)
                     loss = self.pattern_loss(lstm_output, real_batch)
                     loss.backward(); torch.nn.utils.clip_grad_norm_(self.lstm.parameters(), max_norm=1.0); self.lstm_optimizer.step(); lstm_epoch_loss += loss.item()
+                    now = time.perf_counter(); phases['lstm_step'] += now - phase_start; phase_start = now
 
+            elapsed = time.perf_counter() - epoch_start
             avg_g = g_epoch_loss / num_batches if use_gan and num_batches > 0 else 0
             avg_d = d_epoch_loss / num_batches if use_gan and num_batches > 0 else 0
             avg_lstm = lstm_epoch_loss / num_batches if use_lstm and num_batches > 0 else 0
-            print(f"Epoch [{epoch+1}/{epochs}] - "+ (f"G:{avg_g:.4f} D:{avg_d:.4f} " if use_gan else "") + (f"LSTM:{avg_lstm:.4f}" if use_lstm else ""))
-        print("Training finished."); self.save_models()
+            if rank != 0: continue
+            samples_per_sec = samples * world_size / elapsed if elapsed > 0 else 0.0
+            print(f"Epoch [{epoch+1}/{epochs}] - "+ (f"G:{avg_g:.4f} D:{avg_d:.4f} " if use_gan else "") + (f"LSTM:{avg_lstm:.4f} " if use_lstm else "") +
+                  f"{samples_per_sec:.0f} samples/s")
+            self._append_training_stats(stats_path, {
+                'epoch': epoch + 1, 'epochs': epochs, 'world_size': world_size, 'batches': num_batches,
+                'samples': samples * world_size, 'seconds': elapsed, 'samples_per_sec': samples_per_sec,
+                'phase_seconds': phases, 'loss': {'g': avg_g, 'd': avg_d, 'lstm': avg_lstm}})
+            if (epoch + 1) % checkpoint_every == 0 or epoch + 1 == epochs:
+                self.save_training_checkpoint(checkpoint_path, epoch + 1)
+        if rank == 0:
+            print("Training finished."); self.save_models()
+
+    def save_training_checkpoint(self, path, epoch):
+        # Weights, optimizer state and epoch in one file, replaced atomically so a crash mid-write
+        # leaves the previous checkpoint intact
+        checkpoint = {'epoch': epoch, 'torch_rng_state': torch.get_rng_state()}
+        for name in ('generator', 'discriminator', 'lstm', 'g_optimizer', 'd_optimizer', 'lstm_optimizer'):
+            checkpoint[name] = getattr(self, name).state_dict()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        torch.save(checkpoint, tmp_path)
+        os.replace(tmp_path, path)
+        print(f"Checkpoint for epoch {epoch} saved to {path}")
+
+    def load_training_checkpoint(self, path):
+        # Restores a checkpoint written by save_training_checkpoint; returns the number of epochs done
+        if not os.path.exists(path):
+            print(f"No checkpoint at {path}, starting from epoch 1.")
+            return 0
+        # Loaded on the CPU: the RNG state must stay a CPU ByteTensor, and load_state_dict moves
+        # the weights and optimizer state to the device of the parameters
+        checkpoint = torch.load(path, map_location='cpu', weights_only=True)
+        for name in ('generator', 'discriminator', 'lstm', 'g_optimizer', 'd_optimizer', 'lstm_optimizer'):
+            getattr(self, name).load_state_dict(checkpoint[name])
+        torch.set_rng_state(checkpoint['torch_rng_state'])
+        self._model_versions = {}
+        print(f"Resumed from {path} at epoch {checkpoint['epoch']}")
+        return checkpoint['epoch']
+
+    def _append_training_stats(self, path, record):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def model_version(self, use_model='gan'):
+        # Content hash of the model's (fp32) weights, used to key cached results
+        if use_model not in self._model_versions:
+            model = self.model_for(base_model(use_model))
+            digest = hashlib.sha1()
+            for name, tensor in model.state_dict().items():
+                digest.update(name.encode())
+                digest.update(tensor.detach().cpu().numpy().tobytes())
+            self._model_versions[use_model] = f"{use_model}-{digest.hexdigest()[:12]}"
+        return self._model_versions[use_model]
 
     def save_models(self):
+        if self.inference_only: print("Error: Cannot save an inference-only LevelGAN."); return
         try:
             torch.save(self.generator.state_dict(), os.path.join(MODEL_SAVE_DIR, 'generator.pth'))
             torch.save(self.discriminator.state_dict(), os.path.join(MODEL_SAVE_DIR, 'discriminator.pth'))
@@ -192,140 +527,140 @@ class LevelGAN:
 
     def load_models(self):
         loaded_any = False
+        self._model_versions = {}
+        self._compiled_generator, self._quantized = None, {}  # Compiled/quantized copies hold the old weights
         try:
-            if os.path.exists(os.path.join(MODEL_SAVE_DIR, 'generator.pth')):
-                self.generator.load_state_dict(torch.load(os.path.join(MODEL_SAVE_DIR, 'generator.pth')))
+            if self.generator is not None and os.path.exists(os.path.join(MODEL_SAVE_DIR, 'generator.pth')):
+                self.generator.load_state_dict(load_checkpoint(os.path.join(MODEL_SAVE_DIR, 'generator.pth'), self.device), assign=self.inference_only)
                 self.generator.to(self.device)
                 print("Loaded Generator")
                 loaded_any = True
-            if os.path.exists(os.path.join(MODEL_SAVE_DIR, 'discriminator.pth')):
-                self.discriminator.load_state_dict(torch.load(os.path.join(MODEL_SAVE_DIR, 'discriminator.pth')))
+            if self.discriminator is not None and os.path.exists(os.path.join(MODEL_SAVE_DIR, 'discriminator.pth')):
+                self.discriminator.load_state_dict(load_checkpoint(os.path.join(MODEL_SAVE_DIR, 'discriminator.pth'), self.device), assign=self.inference_only)
                 self.discriminator.to(self.device)
                 print("Loaded Discriminator")
                 loaded_any = True
-            if os.path.exists(os.path.join(MODEL_SAVE_DIR, 'lstm.pth')):
-                self.lstm.load_state_dict(torch.load(os.path.join(MODEL_SAVE_DIR, 'lstm.pth')))
+            if self.lstm is not None and os.path.exists(os.path.join(MODEL_SAVE_DIR, 'lstm.pth')):
+                self.lstm.load_state_dict(load_checkpoint(os.path.join(MODEL_SAVE_DIR, 'lstm.pth'), self.device), assign=self.inference_only)
                 self.lstm.to(self.device)
                 print("Loaded LSTM")
                 loaded_any = True
             if not loaded_any:
-                print("No existing model files found. Training from scratch.")
+                print("No existing model files found. " + ("Serving untrained weights." if self.inference_only else "Training from scratch."))
             return loaded_any
         except Exception as e:
             print(f"Error loading models: {e}. Starting fresh.")
             return False
 
-    def generate_level(self, difficulty, score, use_model='gan'):
-        if not (0 <= difficulty <= 1 and 0 <= score <= 1): raise ValueError("Difficulty/score must be 0-1.")
-        input_tensor = torch.FloatTensor([[difficulty, score]]).to(self.device)
-        raw_output = None
-        if use_model == 'gan':
-            self.generator.eval()
-            with torch.no_grad():
-                raw_output = self.generator(input_tensor)
-        elif use_model == 'lstm':
-            self.lstm.eval()
-            with torch.no_grad():
-                hidden = self.lstm.init_hidden(1)
-                hidden = (hidden[0].to(self.device), hidden[1].to(self.device))
-                raw_output, _ = self.lstm(input_tensor.unsqueeze(1), hidden)
+    def model_for(self, use_model):
+        if use_model not in MODEL_CHOICES: raise ValueError(f"Choose from {', '.join(MODEL_CHOICES)}.")
+        model = self.generator if base_model(use_model) == 'gan' else self.lstm
+        if model is None: raise ValueError(f"Model '{use_model}' is not loaded in this inference-only LevelGAN.")
+        if use_model != base_model(use_model):
+            if use_model not in self._quantized: self._quantized[use_model] = quantize_model(model)
+            model = self._quantized[use_model]
+        return model
+
+    def compile_generator(self, mode='script'):
+        # Optimized inference graph for the generator, used by generate_raw_patterns until the weights change:
+        # 'script' is TorchScript, frozen so BatchNorm folds into the Linear layers (builds in well under a second);
+        # 'compile' is torch.compile with a dynamic batch dimension (slow first call, needs a C++ toolchain).
+        if mode in (None, 'none', 'eager'):
+            self._compiled_generator = None
+            return None
+        generator = self.model_for('gan').eval()
+        if mode == 'script':
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', FutureWarning)  # TorchScript is deprecated but still the cheapest to build
+                compiled = torch.jit.optimize_for_inference(torch.jit.freeze(torch.jit.script(generator)))
+        elif mode == 'compile':
+            compiled = torch.compile(generator, dynamic=True)
         else:
-            raise ValueError("Choose 'gan' or 'lstm'.")
-        raw_pattern_scaled = (raw_output.cpu().numpy().flatten() + 1) / 2.0
+            raise ValueError("Choose 'script', 'compile' or 'none'.")
+        self._compiled_generator = compiled
+        return compiled
+
+    def warmup(self, batch_sizes=(1,), use_model='gan'):
+        # Throwaway forward passes at the expected batch sizes, so graph specialization and
+        # allocator growth happen before the first real request
+        rng = np.random.default_rng(0)
+        for batch_size in batch_sizes:
+            self.generate_raw_patterns(rng.random((batch_size, 2)), use_model=use_model)
+
+    def generate_level(self, difficulty, score, use_model='gan', seed=None, candidates=1):
+        return self.generate_levels([difficulty], [score], use_model=use_model, seeds=[seed], candidates=candidates)[0]
+
+    def generate_levels(self, difficulties, scores, use_model='gan', seeds=None, candidates=1):
+        # Batched variant of generate_level: one forward pass for the whole batch.
+        # Each level's post-processing draws from its own np.random.Generator seeded with
+        # seeds[i] (None = fresh entropy), so seeded levels are reproducible.
+        # With candidates > 1 a level that fails the playability check is redrawn up to that many times.
+        difficulties = np.asarray(difficulties, dtype=np.float64).reshape(-1)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+        if difficulties.shape != scores.shape: raise ValueError("Difficulties and scores must have the same length.")
+        if not (np.all((0 <= difficulties) & (difficulties <= 1)) and np.all((0 <= scores) & (scores <= 1))):
+            raise ValueError("Difficulty/score must be 0-1.")
+        raw_patterns = self.generate_raw_patterns(np.stack([difficulties, scores], axis=1), use_model=use_model)
         print("Applying enhanced post-processing...")
-        processed_pattern = self._post_process_pattern_enhanced(raw_pattern_scaled, difficulty, score)
-        return processed_pattern
+        if candidates > 1:
+            from playability import post_process_playable
+            return post_process_playable(raw_patterns, difficulties, scores, seeds=seeds, candidates=candidates)[0]
+        return post_process_patterns(raw_patterns, difficulties, scores, seeds=seeds)
+
+    def generate_raw_patterns(self, conditions, use_model='gan'):
+        if base_model(use_model) == 'lstm':
+            return self.lstm_step(conditions, use_model=use_model)[0]
+        model = self.model_for(use_model)
+        quantized = use_model != base_model(use_model)
+        device = torch.device('cpu') if quantized else self.device  # Quantized kernels are CPU only
+        input_tensor = torch.as_tensor(np.asarray(conditions, dtype=np.float32).reshape(-1, 2)).to(device)
+        if not quantized:
+            self.generator.eval()
+            if self._compiled_generator is not None: model = self._compiled_generator
+        with torch.inference_mode():
+            raw_output = model(input_tensor)
+        return (raw_output.cpu().numpy() + 1) / 2.0
 
-    def _post_process_pattern_enhanced(self, pattern_1d, difficulty, score):
+    def lstm_step(self, conditions, hidden=None, use_model='lstm'):
+        # One recurrent step of the LSTM: (B, 2) conditions and the previous (h, c), each
+        # (num_layers, B, hidden_size), or None for fresh sequences -> raw patterns in [0, 1] and the new (h, c)
+        if base_model(use_model) != 'lstm': raise ValueError("lstm_step needs 'lstm' or 'lstm_int8'.")
+        model = self.model_for(use_model)
+        device = torch.device('cpu') if use_model != base_model(use_model) else self.device  # Quantized kernels are CPU only
+        input_tensor = torch.as_tensor(np.asarray(conditions, dtype=np.float32).reshape(-1, 2)).to(device)
+        if use_model == 'lstm': self.lstm.eval()
+        with torch.inference_mode():
+            if hidden is None: hidden = self.lstm.init_hidden(input_tensor.size(0))
+            hidden = (hidden[0].to(device), hidden[1].to(device))
+            raw_output, hidden = model(input_tensor.unsqueeze(1), hidden)
+        return (raw_output.cpu().numpy() + 1) / 2.0, hidden
+
+    def _post_process_pattern_enhanced(self, pattern_1d, difficulty, score, rng=None):
         if pattern_1d.size != PATTERN_SIZE:
             print(f"Error: Incorrect pattern size in post-processing: {pattern_1d.size}")
             return np.zeros(PATTERN_SIZE)
-    
-        # Initialize the pattern_2d array
-        pattern_2d = np.zeros((GRID_ROWS, GRID_COLS))
-        
-        # Easy Level Generation (Simple horizontal patterns)
-        if difficulty < 0.3:
-            platform_length = 6
-            gap_size = 2
-            height_levels = [GRID_ROWS - SAFE_ZONE_ROWS - 5, 
-                            GRID_ROWS - SAFE_ZONE_ROWS - 8,
-                            GRID_ROWS - SAFE_ZONE_ROWS - 11]
-            
-            current_x = 2
-            while current_x < GRID_COLS - platform_length:
-                platform_y = np.random.choice(height_levels)
-                for x in range(current_x, min(current_x + platform_length, GRID_COLS)):
-                    pattern_2d[platform_y, x] = 1.0
-                current_x += platform_length + gap_size
-    
-        # Medium Level Generation (Zigzag patterns)
-        elif difficulty < 0.7:
-            current_x = 2
-            current_y = GRID_ROWS - SAFE_ZONE_ROWS - 5
-            direction = 1  # 1 for up, -1 for down
-            
-            while current_x < GRID_COLS - 4:
-                # Main platform
-                platform_length = np.random.randint(4, 6)
-                for x in range(current_x, min(current_x + platform_length, GRID_COLS)):
-                    pattern_2d[current_y, x] = 1.0
-                    
-                # Branch platform (based on score)
-                if score > 0.4 and np.random.random() < 0.6:
-                    branch_y = current_y + np.random.choice([-2, 2])
-                    if 1 < branch_y < GRID_ROWS - SAFE_ZONE_ROWS:
-                        for x in range(current_x + 2, min(current_x + 4, GRID_COLS)):
-                            pattern_2d[branch_y, x] = 1.0
-                    
-                # Move to next position
-                current_x += platform_length + 2
-                current_y += direction * np.random.randint(2, 4)
-                
-                # Change direction if reaching bounds
-                if current_y <= 2 or current_y >= GRID_ROWS - SAFE_ZONE_ROWS - 2:
-                    direction *= -1
-                    current_y += direction * 2
-    
-        # Hard Level Generation (Spiral patterns)
-        else:
-            center_x, center_y = GRID_COLS // 2, (GRID_ROWS - SAFE_ZONE_ROWS) // 2
-            radius = 8
-            angle_step = 0.3
-            platform_length = 3
-            
-            for angle in np.arange(0, 6 * np.pi, angle_step):
-                current_radius = radius + angle
-                x = int(center_x + current_radius * np.cos(angle))
-                y = int(center_y + current_radius * np.sin(angle))
-                
-                if 1 < y < GRID_ROWS - SAFE_ZONE_ROWS and 1 < x < GRID_COLS - platform_length:
-                    for dx in range(platform_length):
-                        pattern_2d[y, x + dx] = 1.0
-                    
-                # Add connecting platforms based on score
-                if score > 0.6 and np.random.random() < 0.3:
-                    connect_y = y + np.random.choice([-2, 2])
-                    if 1 < connect_y < GRID_ROWS - SAFE_ZONE_ROWS:
-                        for dx in range(-2, 3):
-                            if 1 < x + dx < GRID_COLS:
-                                pattern_2d[connect_y, x + dx] = 1.0
-    
-        # Ensure minimum number of platforms
-        min_platforms = int(15 + difficulty * 10 + score * 15)
-        current_platforms = np.sum(pattern_2d)
-        if current_platforms < min_platforms:
-            needed = int(min_platforms - current_platforms)
-            for _ in range(needed):
-                x = np.random.randint(2, GRID_COLS - 4)
-                y = np.random.randint(2, GRID_ROWS - SAFE_ZONE_ROWS - 1)
-                for dx in range(3):
-                    if x + dx < GRID_COLS:
-                        pattern_2d[y, x + dx] = 1.0
-    
-        # Clear safe zone and top row
-        pattern_2d[GRID_ROWS - SAFE_ZONE_ROWS:, :] = 0.0
-        pattern_2d[0:1, :] = 0.0
-        
-        print(f"Generated {pattern_2d.sum()} platforms with difficulty {difficulty:.2f}")
-        return pattern_2d.flatten()
\ No newline at end of file
+        pattern = post_process_patterns(pattern_1d.reshape(1, PATTERN_SIZE), [difficulty], [score], rng=rng)[0]
+        print(f"Generated {pattern.sum()} platforms with difficulty {difficulty:.2f}")
+        return pattern
+
+
+def _distributed_train_worker(rank, world_size, port, train_kwargs):
+    torch.distributed.init_process_group('gloo', init_method=f'tcp://127.0.0.1:{port}', rank=rank, world_size=world_size)
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // world_size))
+    torch.manual_seed(0)  # Same initial weights in every process; DDP also broadcasts rank 0's
+    try:
+        LevelGAN(load_pattern_history=train_kwargs.get('dataset_path') is None).train(**train_kwargs)
+    finally:
+        torch.distributed.destroy_process_group()
+
+def train_distributed(world_size, **train_kwargs):
+    # CPU data-parallel training: `world_size` processes (gloo backend) each train on a shard of
+    # every epoch and all-reduce gradients. Rank 0 prints, writes stats and checkpoints.
+    import socket
+    import torch.multiprocessing as mp
+    if world_size <= 1: return LevelGAN(load_pattern_history=train_kwargs.get('dataset_path') is None).train(**train_kwargs)
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    mp.spawn(_distributed_train_worker, args=(world_size, port, train_kwargs), nprocs=world_size, join=True)
+
@@ -1,41 +1,69 @@
+import argparse
 import os
 import cv2
 import numpy as np
 
-levels_folder = '/Users/parthpsg/Documents/Professional/Coding/IPD/GameAI/game_levels'
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+levels_folder = os.path.join(BASE_DIR, 'game_levels')
+archive_folder = os.path.join(BASE_DIR, 'level_archive')
 
 def analyze_level_pattern(image_path):
     img = cv2.imread(image_path)
     if img is None:
         return None, None
     
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    if not contours:
+    blocks, total_area, color_variety = extract_blocks(img)
+    if not blocks:
         return None, None
-    
-    # Extract block positions and sizes
-    blocks = []
-    total_area = 0
-    unique_colors = set()
-    
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
-        area = cv2.contourArea(contour)
-        # Get color of the block
-        mask = np.zeros(img.shape[:2], np.uint8)
-        cv2.drawContours(mask, [contour], -1, 255, -1)
-        mean_color = cv2.mean(img, mask=mask)[:3]  # BGR values
-        color_key = tuple(int(c) for c in mean_color)
-        unique_colors.add(color_key)
-        total_area += area
-        blocks.append((x, y, w, h, area))
-    
+    return rate_blocks(blocks, total_area, color_variety, img.shape)
+
+def extract_blocks(img):
+    # One labelling pass replaces per-contour masks. Each external contour of the thresholded
+    # image corresponds to one 8-connected region of the image minus its outer background
+    # (a block with its holes filled), which is exactly what drawContours filled for cv2.mean.
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    foreground = (gray > 127).astype(np.uint8)
+    # Background reachable from the border (4-connected, the dual of 8-connected blocks)
+    _, background = cv2.connectedComponents(1 - np.pad(foreground, 1), connectivity=4)
+    filled = (background[1:-1, 1:-1] != background[0, 0]).astype(np.uint8)
+    num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(filled, connectivity=8)
+    if num_labels < 2:
+        return [], 0, 0
+    
+    # cv2.contourArea of the contour through the border pixel centres: every 2x2 window fully
+    # inside a block adds 1, every window with 3 of its 4 pixels inside adds a half triangle.
+    # Distinct blocks never share a window, so its largest label is its block.
+    occupied = np.pad(filled, ((0, 1), (0, 1)))
+    inside = occupied[:-1, :-1] + occupied[1:, :-1] + occupied[:-1, 1:] + occupied[1:, 1:]
+    padded = np.pad(labels, ((0, 1), (0, 1)))
+    rows, cols = np.nonzero(inside == 3)
+    corner_labels = np.maximum(np.maximum(padded[rows, cols], padded[rows + 1, cols]),
+                               np.maximum(padded[rows, cols + 1], padded[rows + 1, cols + 1]))
+    areas = (np.bincount(labels[inside == 4], minlength=num_labels)
+             + 0.5 * np.bincount(corner_labels, minlength=num_labels))
+    
+    # Mean BGR per block, computed like cv2.mean (channel sum times 1 / pixel count)
+    pixels = np.flatnonzero(labels)
+    pixel_labels = labels.ravel()[pixels]
+    colors = img.reshape(-1, 3)[pixels]
+    counts = stats[:, cv2.CC_STAT_AREA].astype(np.float64)
+    means = np.stack([np.bincount(pixel_labels, weights=colors[:, c], minlength=num_labels)
+                      for c in range(3)], axis=1) * (1.0 / counts)[:, None]
+    
+    # findContours order: descending by each block's first pixel in raster order
+    ids = np.arange(1, num_labels)
+    tops = stats[ids, cv2.CC_STAT_TOP]
+    firsts = np.argmax(labels[tops] == ids[:, None], axis=1)
+    ids = ids[np.lexsort((firsts, tops))[::-1]]
+    
+    blocks = [(x, y, w, h, area) for (x, y, w, h), area in
+              zip(stats[ids, :4].tolist(), areas[ids].tolist())]
+    unique_colors = {tuple(int(c) for c in mean) for mean in means[ids].tolist()}
+    return blocks, float(np.sum(areas[ids])), len(unique_colors)
+
+def rate_blocks(blocks, total_area, color_variety, shape):
     blocks = np.array(blocks)
     num_blocks = len(blocks)
-    color_variety = len(unique_colors)
     if num_blocks < 5:
         return 0.101, 0.101
     
@@ -44,11 +72,11 @@ def analyze_level_pattern(image_path):
     x_positions = blocks[:, 0]
     
     # Vertical analysis
-    y_spread = np.std(y_positions) / img.shape[0]
+    y_spread = np.std(y_positions) / shape[0]
     y_clusters = len(np.unique(y_positions // 32))  # Number of distinct rows
     
     # Horizontal analysis
-    x_spread = np.std(x_positions) / img.shape[1]
+    x_spread = np.std(x_positions) / shape[1]
     x_clusters = len(np.unique(x_positions // 32))  # Number of distinct columns
     
     # Pattern complexity
@@ -57,12 +85,12 @@ def analyze_level_pattern(image_path):
     pattern_regularity = (np.std(y_diffs) + np.std(x_diffs)) / 2
     
     # Spatial distribution
-    coverage = total_area / (img.shape[0] * img.shape[1])
+    coverage = total_area / (shape[0] * shape[1])
     density = num_blocks / (x_clusters * y_clusters) if x_clusters and y_clusters else 0
     
     # Pattern type detection first
     is_spiral = detect_spiral_pattern(blocks)
-    has_symmetry = check_symmetry(blocks, img.shape)
+    has_symmetry = check_symmetry(blocks, shape)
     
     # Calculate advanced difficulty
     difficulty = (
@@ -131,52 +159,41 @@ def check_symmetry(blocks, shape):
     
     return abs(left_blocks - right_blocks) / len(blocks) < 0.3
 
-def process_all_levels():
+def process_all_levels(folder=None, workers=None, cache_path=None):
+    # One rating per image content, cached across runs (see ratings_cache.py), then normalized
+    # to the corpus min/max in one vectorized step
+    from ratings_cache import load_ratings, CACHE_FILENAME
+    folder = folder or levels_folder
+    cache_path = cache_path or os.path.join(archive_folder, CACHE_FILENAME)
+    filenames = sorted(f for f in os.listdir(folder) if f.endswith('.png'))
+    raw = load_ratings(folder, filenames, cache_path, workers=workers)
+    
+    rated = [filename for filename in filenames if not np.isnan(raw[filename]).any()]
+    if not rated:
+        return {}
+    values = np.array([raw[filename] for filename in rated], dtype=np.float64)
+    
+    # Normalize using actual min/max values
+    minimum, maximum = values.min(axis=0), values.max(axis=0)
+    normalized = (values - minimum) / (maximum - minimum)
+    
     level_ratings = {}
-    all_difficulties = []
-    all_scores = []
-    
-    # First pass: collect all values
-    for filename in os.listdir(levels_folder):
-        if filename.endswith('.png'):
-            image_path = os.path.join(levels_folder, filename)
-            difficulty, score = analyze_level_pattern(image_path)
-            
-            if difficulty is not None and score is not None:
-                all_difficulties.append(difficulty)
-                all_scores.append(score)
-    
-    # Calculate actual min and max from the data
-    min_difficulty = min(all_difficulties)
-    max_difficulty = max(all_difficulties)
-    min_score = min(all_scores)
-    max_score = max(all_scores)
-    
-    # Second pass: normalize using actual min/max
-    for filename in os.listdir(levels_folder):
-        if filename.endswith('.png'):
-            image_path = os.path.join(levels_folder, filename)
-            difficulty, score = analyze_level_pattern(image_path)
-            
-            if difficulty is not None and score is not None:
-                # Normalize using actual min/max values
-                normalized_difficulty = (difficulty - min_difficulty) / (max_difficulty - min_difficulty)
-                normalized_score = (score - min_score) / (max_score - min_score)
-                
-                new_name = f"level_d{normalized_difficulty}_s{normalized_score}.png"
-                level_ratings[filename] = {
-                    'difficulty': normalized_difficulty,
-                    'score': normalized_score,
-                    'new_name': new_name
-                }
-                print(f"Analyzed {filename}: Difficulty={normalized_difficulty}, Score={normalized_score}")
+    for filename, (normalized_difficulty, normalized_score) in zip(rated, normalized):
+        new_name = f"level_d{normalized_difficulty}_s{normalized_score}.png"
+        level_ratings[filename] = {
+            'difficulty': normalized_difficulty,
+            'score': normalized_score,
+            'new_name': new_name
+        }
+        print(f"Analyzed {filename}: Difficulty={normalized_difficulty}, Score={normalized_score}")
     
     return level_ratings
 
-def rename_levels(ratings):
+def rename_levels(ratings, folder=None):
+    folder = folder or levels_folder
     for old_name, info in ratings.items():
-        old_path = os.path.join(levels_folder, old_name)
-        new_path = os.path.join(levels_folder, info['new_name'])
+        old_path = os.path.join(folder, old_name)
+        new_path = os.path.join(folder, info['new_name'])
         
         try:
             os.rename(old_path, new_path)
@@ -185,13 +202,18 @@ def rename_levels(ratings):
             print(f"Error renaming {old_name}: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rate game levels and rename them by difficulty and score.")
+    parser.add_argument('--folder', default=levels_folder, help="Folder of level PNGs (default game_levels)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Processes for rating new images")
+    parser.add_argument('--cache', help="Ratings cache file (default level_archive/ratings_cache.npz)")
+    args = parser.parse_args()
     print("Analyzing level patterns...")
-    ratings = process_all_levels()
+    ratings = process_all_levels(args.folder, workers=args.workers, cache_path=args.cache)
     
     if ratings:
         print("\nReady to rename files. Continue? (y/n)")
         if input().lower() == 'y':
-            rename_levels(ratings)
+            rename_levels(ratings, args.folder)
             print("Level renaming completed!")
     else:
         print("No valid levels found for analysis.")
\ No newline at end of file
@@ -0,0 +1,78 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from level_constants import GRID_ROWS, GRID_COLS, BOX_SIZE
+from asset_cache import asset_cache, BACKGROUND_PATH, BACKGROUND_SIZE, BOX_TEMPLATE_PATH, BOX_SPRITE_SIZE
+
+# Vectorized pattern -> layout conversion and level compositing.
+# Everything works on the 25x25 occupancy grid, so the cost of a request no longer
+# depends on how many blocks the level contains.
+
+PLATFORM_THRESHOLD = 0.5
+
+
+def pattern_to_grid(pattern, threshold=PLATFORM_THRESHOLD):
+    return np.asarray(pattern).reshape(GRID_ROWS, GRID_COLS) > threshold
+
+
+def grid_to_layout(grid):
+    # np.argwhere walks the grid row-major, matching the old nested y/x loop order
+    cells = np.argwhere(grid) * BOX_SIZE
+    return [{'x': int(x), 'y': int(y), 'type': 'solid'} for y, x in cells]
+
+
+def pattern_to_layout(pattern, threshold=PLATFORM_THRESHOLD):
+    return grid_to_layout(pattern_to_grid(pattern, threshold))
+
+
+def add_connections(grid):
+    # A block with a vertical neighbour gets a box below it, a block with a
+    # horizontal neighbour gets a box to its right (boxes past the edge are clipped).
+    # Works on one (25, 25) grid or a (N, 25, 25) batch.
+    up = np.zeros_like(grid); up[..., 1:, :] = grid[..., :-1, :]
+    down = np.zeros_like(grid); down[..., :-1, :] = grid[..., 1:, :]
+    left = np.zeros_like(grid); left[..., 1:] = grid[..., :-1]
+    right = np.zeros_like(grid); right[..., :-1] = grid[..., 1:]
+    vertical = grid & (up | down)
+    horizontal = grid & (left | right)
+    occupancy = grid.copy()
+    occupancy[..., 1:, :] |= vertical[..., :-1, :]
+    occupancy[..., 1:] |= horizontal[..., :-1]
+    return occupancy
+
+
+def tile_sprite(box):
+    # Full-frame layer with the box sprite repeated in every grid cell
+    sprite = np.asarray(box.convert('RGBA'))
+    return Image.fromarray(np.tile(sprite, (GRID_ROWS, GRID_COLS, 1)), 'RGBA')
+
+
+def compose_level(background, tiled_box, occupancy):
+    # Paste the sprite into every occupied cell with a single masked paste
+    cell_mask = np.repeat(np.repeat(occupancy, BOX_SIZE, axis=0), BOX_SIZE, axis=1)
+    alpha = np.asarray(tiled_box.getchannel('A'))
+    mask = Image.fromarray(np.where(cell_mask, alpha, 0).astype(np.uint8), 'L')
+    frame = background.copy()
+    frame.paste(tiled_box, (0, 0), mask)
+    return frame
+
+
+def render_pattern(pattern, background, tiled_box, difficulty):
+    grid = pattern_to_grid(pattern)
+    occupancy = add_connections(grid) if difficulty > 0.5 else grid
+    return grid_to_layout(grid), compose_level(background, tiled_box, occupancy)
+
+
+IMAGE_SAVE_OPTIONS = {'PNG': {}, 'WEBP': {'quality': 90}}
+
+
+def render_level_image(pattern, difficulty, image_format='PNG', save_options=None):
+    # Layout plus encoded image using the process's asset cache; safe to run in an executor worker
+    background = asset_cache.get(BACKGROUND_PATH, BACKGROUND_SIZE)
+    tiled_box = asset_cache.derived(BOX_TEMPLATE_PATH, BOX_SPRITE_SIZE, 'tiled', tile_sprite)
+    layout, frame = render_pattern(pattern, background, tiled_box, difficulty)
+    buffer = io.BytesIO()
+    frame.save(buffer, format=image_format, **(save_options if save_options is not None else IMAGE_SAVE_OPTIONS.get(image_format, {})))
+    return layout, buffer.getvalue()
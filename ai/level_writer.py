@@ -0,0 +1,100 @@
+import json
+import os
+import queue
+import threading
+
+# Background persistence for generated levels.
+# The request path hands over the in-memory layout and encoded image and returns immediately;
+# a daemon thread drains the queue in batches and writes the files. When the queue is full
+# the write is dropped (and counted) instead of blocking the caller.
+
+DEFAULT_QUEUE_SIZE = 256
+DEFAULT_BATCH_SIZE = 16
+
+
+class LevelWriter:
+    def __init__(self, output_folder, enabled=True, max_queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE):
+        self.output_folder = output_folder
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.batches = 0
+
+    def start(self):
+        if not self.enabled or self._thread is not None: return
+        os.makedirs(self.output_folder, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='level-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        # Flush what is queued, then stop the thread
+        if self._thread is None: return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def paths(self, name, image_ext='png'):
+        return (os.path.join(self.output_folder, f'{name}.txt'),
+                os.path.join(self.output_folder, f'{name}.{image_ext}'))
+
+    def submit(self, name, layout, image_bytes=None, image_ext='png'):
+        # Returns the (layout_path, image_path) the level will be written to, or None if not persisted.
+        # Without image_bytes only the layout is written and image_path is None.
+        if not self.enabled or self._thread is None: return None
+        try:
+            self._queue.put_nowait((name, layout, image_bytes, image_ext))
+        except queue.Full:
+            with self._lock: self.dropped += 1
+            print(f"Level writer queue full, dropping write of {name}")
+            return None
+        layout_path, image_path = self.paths(name, image_ext)
+        return layout_path, image_path if image_bytes is not None else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'pending': self._queue.qsize(),
+                'capacity': self._queue.maxsize,
+                'saturation': self._queue.qsize() / self._queue.maxsize if self._queue.maxsize else 0.0,
+                'written': self.written,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'batches': self.batches,
+            }
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is None for item in items)
+            self._write_batch([item for item in items if item is not None])
+            if stop: return
+
+    def _write_batch(self, items):
+        written, errors = 0, 0
+        for name, layout, image_bytes, image_ext in items:
+            layout_path, image_path = self.paths(name, image_ext)
+            try:
+                with open(layout_path, 'w') as f:
+                    json.dump(layout, f, indent=2)
+                if image_bytes is not None:
+                    with open(image_path, 'wb') as f:
+                        f.write(image_bytes)
+                written += 1
+            except Exception as e:
+                errors += 1
+                print(f"Error persisting level {name}: {e}")
+        with self._lock:
+            self.written += written
+            self.errors += errors
+            if items: self.batches += 1
@@ -0,0 +1,363 @@
+# Load test for POST /generate-level
+# Drives the FastAPI app from main.py either in-process over ASGI (httpx.ASGITransport, the
+# app's lifespan runs inside this process), against a uvicorn server this script starts on a
+# local port, or against an already running server (--url). Load is either closed-loop
+# (--concurrency clients, each sending its next request when the previous one returns) or
+# open-loop (--rate requests/second with Poisson arrivals; latency is measured from the
+# scheduled send time, so a stalled server is not hidden by the client waiting on it).
+#
+# Request parameters follow a profile:
+#   game_data - resampled playtest sessions from Deep-Q-Learning/dataset/game_data.csv, mapped
+#               the way the web client does: Easy/Medium/Hard(/Extreme) -> 0.3/0.6/0.9, score
+#               normalized per cleared level against 1000 points (default)
+#   tiers     - the client's three difficulty settings, medium twice as common, uniform scores
+#   uniform   - difficulty and score uniform on [0, 1]
+#
+# Reports throughput, p50/p95/p99 latency, error rate and status counts, plus a timeline of the
+# server's CPU and RSS read from /proc (the server process and its children, e.g. process-backend
+# workers). In-process runs measure this process, which includes the load generator itself.
+#
+# Examples:
+#   python load_test.py --concurrency 16 --duration 30
+#   python load_test.py --server uvicorn --rate 50 --duration 60 --json load.json
+#   python load_test.py --url http://127.0.0.1:5000 --pid 12345 --concurrency 32
+import argparse
+import asyncio
+import csv
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+GAME_DATA_PATH = os.path.join(os.path.dirname(current_dir), 'Deep-Q-Learning', 'dataset', 'game_data.csv')
+CLIENT_DIFFICULTIES = {'Easy': 0.3, 'Medium': 0.6, 'Hard': 0.9, 'Extreme': 0.9}  # GameEngine.tsx mapDifficultyToValue
+MAX_EXPECTED_SCORE_PER_LEVEL = 1000  # GameEngine.tsx normalizeScore
+PROFILES = ('game_data', 'tiers', 'uniform')
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def load_game_data(path=GAME_DATA_PATH):
+    # (difficulty, score) pairs of the playtest sessions, as the client would send them
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    difficulties = np.array([CLIENT_DIFFICULTIES[row['DifficultyAdjustment']] for row in rows])
+    levels = np.array([max(1.0, float(row['LevelCleared'])) for row in rows])
+    scores = np.clip(np.array([float(row['Score']) for row in rows]) / (levels * MAX_EXPECTED_SCORE_PER_LEVEL), 0, 1)
+    return difficulties, scores
+
+
+class RequestSampler:
+    # Request bodies drawn from a profile; a fraction of them carry a seed (cacheable)
+    def __init__(self, profile='game_data', seed_fraction=0.0, rng_seed=0):
+        if profile not in PROFILES: raise ValueError(f"Unknown profile '{profile}', expected one of {', '.join(PROFILES)}")
+        self.profile = profile
+        self.seed_fraction = seed_fraction
+        self.rng = np.random.default_rng(rng_seed)
+        self.game_data = load_game_data() if profile == 'game_data' else None
+
+    def sample(self):
+        if self.profile == 'game_data':
+            i = self.rng.integers(len(self.game_data[0]))
+            difficulty, score = self.game_data[0][i], self.game_data[1][i]
+        elif self.profile == 'tiers':
+            difficulty, score = self.rng.choice([0.3, 0.6, 0.6, 0.9]), self.rng.random()
+        else:
+            difficulty, score = self.rng.random(), self.rng.random()
+        body = {'difficulty': round(float(difficulty), 4), 'score': round(float(score), 4)}
+        if self.rng.random() < self.seed_fraction:
+            body['seed'] = int(self.rng.integers(1000))
+        return body
+
+
+def process_tree(pid):
+    # pid and all of its descendants
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit(): continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        stack.extend(children.get(current, []))
+    return pids
+
+
+def process_usage(pid):
+    # (cpu seconds, rss bytes) of one process, or None once it has exited
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/statm') as f:
+            rss_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS, rss_pages * PAGE_SIZE
+
+
+class ProcSampler:
+    # Background thread sampling CPU (% of one core) and RSS of a process tree from /proc
+    def __init__(self, pid, interval=1.0):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._cpu = {}  # pid -> last cpu seconds, so exited workers do not make the total jump back
+
+    def _read(self):
+        rss = 0
+        for pid in process_tree(self.pid):
+            usage = process_usage(pid)
+            if usage is None: continue
+            self._cpu[pid] = usage[0]
+            rss += usage[1]
+        return sum(self._cpu.values()), rss
+
+    def _run(self):
+        start = time.perf_counter()
+        last_time, (last_cpu, _) = start, self._read()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            cpu, rss = self._read()
+            self.samples.append({'t': round(now - start, 2), 'cpu_percent': round(100 * (cpu - last_cpu) / (now - last_time), 1),
+                                 'rss_mb': round(rss / 2 ** 20, 1)})
+            last_time, last_cpu = now, cpu
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join()
+        return self.samples
+
+
+class Recorder:
+    # Per-request outcomes: (finish time relative to the start, latency s, status or exception name)
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.results = []
+
+    def record(self, latency, status):
+        self.results.append((time.perf_counter() - self.start, latency, status))
+
+
+async def send(client, sampler, recorder, response_format, scheduled=None):
+    body = sampler.sample()
+    start = time.perf_counter() if scheduled is None else scheduled
+    try:
+        response = await client.post('/generate-level', json=body, params={'format': response_format})
+        await response.aread()
+        status = response.status_code
+    except Exception as e:
+        status = type(e).__name__
+    recorder.record(time.perf_counter() - start, status)
+
+
+async def closed_loop(client, sampler, recorder, concurrency, duration, response_format):
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await send(client, sampler, recorder, response_format)
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(client, sampler, recorder, rate, duration, response_format, max_outstanding):
+    # Poisson arrivals at `rate`/s; arrivals beyond max_outstanding in-flight requests are dropped
+    rng = np.random.default_rng(1)
+    start = time.perf_counter()
+    next_send, tasks, dropped = start, set(), 0
+    while next_send < start + duration:
+        await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+        if len(tasks) >= max_outstanding:
+            dropped += 1
+            recorder.record(0.0, 'dropped')
+        else:
+            task = asyncio.create_task(send(client, sampler, recorder, response_format, scheduled=next_send))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        next_send += rng.exponential(1.0 / rate)
+    await asyncio.gather(*tasks)
+    return dropped
+
+
+async def wait_ready(client, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            response = await client.get('/ready')
+            if response.status_code == 200: return response.json()
+            if response.json().get('error'): raise RuntimeError(f"Server warmup failed: {response.json()['error']}")
+        except RuntimeError:
+            raise
+        except Exception:
+            pass  # Server not listening yet
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"Server not ready after {timeout}s")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def summarize(results, elapsed, samples, interval):
+    latencies = np.array([latency for _, latency, status in results if status != 'dropped']) * 1000
+    ok = np.array([latency for _, latency, status in results if status == 200]) * 1000
+    statuses = Counter(str(status) for _, _, status in results)
+    errors = len(results) - statuses.get('200', 0)
+
+    def percentiles(values):
+        if not len(values): return {}
+        return {f'p{q}_ms': round(float(np.percentile(values, q)), 2) for q in (50, 95, 99)} | {'max_ms': round(float(values.max()), 2)}
+
+    # Completed requests and latency per sampling window, aligned with the /proc samples
+    timeline = []
+    for window_start in np.arange(0, elapsed, interval):
+        window = [(latency, status) for t, latency, status in results if window_start <= t < window_start + interval]
+        point = {'t': round(float(window_start + interval), 2), 'requests': len(window),
+                 'errors': sum(1 for _, status in window if status != 200)}
+        window_ok = np.array([latency for latency, status in window if status == 200]) * 1000
+        if len(window_ok): point['p50_ms'] = round(float(np.percentile(window_ok, 50)), 2)
+        timeline.append(point)
+    for point, sample in zip(timeline, samples):
+        point['cpu_percent'], point['rss_mb'] = sample['cpu_percent'], sample['rss_mb']
+
+    cpu = [sample['cpu_percent'] for sample in samples]
+    rss = [sample['rss_mb'] for sample in samples]
+    return {
+        'requests': len(results),
+        'seconds': round(elapsed, 2),
+        'throughput_rps': round(statuses.get('200', 0) / elapsed, 2),
+        'error_rate': round(errors / len(results), 4) if results else 0.0,
+        'statuses': dict(statuses),
+        'latency': percentiles(latencies),
+        'latency_ok': percentiles(ok),
+        'server': {'cpu_percent_mean': round(float(np.mean(cpu)), 1) if cpu else None,
+                   'cpu_percent_max': max(cpu) if cpu else None,
+                   'rss_mb_max': max(rss) if rss else None},
+        'timeline': timeline,
+    }
+
+
+async def run(args):
+    import httpx
+    sampler = RequestSampler(args.profile, args.seed_fraction)
+    server = None
+    lifespan = None
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=timeout)
+        pid = args.pid
+    elif args.server == 'uvicorn':
+        port = free_port()
+        server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port),
+                                   '--log-level', 'warning'], cwd=current_dir, env=os.environ.copy())
+        client = httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', timeout=timeout,
+                                   limits=httpx.Limits(max_connections=None, max_keepalive_connections=None))
+        pid = server.pid
+    else:
+        import main
+        lifespan = main.lifespan(main.app)  # ASGITransport does not send lifespan events
+        await lifespan.__aenter__()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://load-test', timeout=timeout)
+        pid = os.getpid()
+
+    try:
+        ready = await wait_ready(client, args.ready_timeout)
+        print(f"Server ready (warmup {ready.get('seconds', 0):.2f}s), profile {args.profile}, "
+              + (f"rate {args.rate}/s" if args.rate else f"concurrency {args.concurrency}") + f" for {args.duration}s")
+        proc_sampler = ProcSampler(pid, args.sample_interval) if pid else None
+        if proc_sampler: proc_sampler.start()
+        recorder = Recorder()
+        dropped = 0
+        if args.rate:
+            dropped = await open_loop(client, sampler, recorder, args.rate, args.duration, args.format, args.max_outstanding)
+        else:
+            await closed_loop(client, sampler, recorder, args.concurrency, args.duration, args.format)
+        elapsed = time.perf_counter() - recorder.start
+        samples = proc_sampler.stop() if proc_sampler else []
+        metrics = None
+        try:
+            metrics = (await client.get('/metrics')).json()
+        except Exception as e:
+            print(f"Warning: Could not read /metrics: {e}")
+    finally:
+        await client.aclose()
+        if lifespan is not None: await lifespan.__aexit__(None, None, None)
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = summarize(recorder.results, elapsed, samples, args.sample_interval)
+    report['dropped'] = dropped
+    report['config'] = {'target': args.url or args.server, 'profile': args.profile, 'concurrency': None if args.rate else args.concurrency,
+                        'rate': args.rate, 'duration': args.duration, 'format': args.format, 'seed_fraction': args.seed_fraction}
+    report['metrics'] = metrics
+    return report
+
+
+def print_report(report):
+    print(f"\n{'t (s)':>6} {'req':>6} {'err':>5} {'p50 ms':>9} {'cpu %':>7} {'rss MB':>8}")
+    for point in report['timeline']:
+        print(f"{point['t']:>6.1f} {point['requests']:>6} {point['errors']:>5} {point.get('p50_ms', float('nan')):>9.2f} "
+              f"{point.get('cpu_percent', float('nan')):>7.1f} {point.get('rss_mb', float('nan')):>8.1f}")
+    latency = report['latency']
+    print(f"\nRequests: {report['requests']} in {report['seconds']}s, {report['throughput_rps']} ok/s, "
+          f"error rate {report['error_rate']:.2%} {report['statuses']}")
+    if latency:
+        print(f"Latency: p50 {latency['p50_ms']} ms, p95 {latency['p95_ms']} ms, p99 {latency['p99_ms']} ms, max {latency['max_ms']} ms")
+    server = report['server']
+    if server['cpu_percent_mean'] is not None:
+        print(f"Server: CPU mean {server['cpu_percent_mean']}% / max {server['cpu_percent_max']}%, RSS max {server['rss_mb_max']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test POST /generate-level at a target concurrency or request rate.")
+    parser.add_argument('--server', choices=('asgi', 'uvicorn'), default='asgi',
+                        help="Run the app in-process over ASGI, or start a local uvicorn server")
+    parser.add_argument('--url', help="Base URL of an already running server (overrides --server)")
+    parser.add_argument('--pid', type=int, help="With --url: server pid to sample CPU/RSS from")
+    parser.add_argument('--concurrency', type=int, default=8, help="Closed-loop clients")
+    parser.add_argument('--rate', type=float, help="Open-loop requests/second (Poisson arrivals) instead of --concurrency")
+    parser.add_argument('--max-outstanding', type=int, default=1000, help="Open loop: in-flight cap, later arrivals are dropped")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds of load")
+    parser.add_argument('--profile', choices=PROFILES, default='game_data', help="Difficulty/score distribution")
+    parser.add_argument('--seed-fraction', type=float, default=0.0, help="Fraction of requests with a seed (the client sends none)")
+    parser.add_argument('--format', default='json', help="Response format (?format=)")
+    parser.add_argument('--timeout', type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument('--ready-timeout', type=float, default=120, help="Seconds to wait for /ready")
+    parser.add_argument('--sample-interval', type=float, default=1.0, help="Seconds between /proc samples")
+    parser.add_argument('--persist', action='store_true', help="Keep LEVEL_PERSIST on for local servers (writes generated_levels/)")
+    parser.add_argument('--json', help="Write the report to this JSON file")
+    args = parser.parse_args()
+    if not args.persist: os.environ.setdefault('LEVEL_PERSIST', '0')  # Before main.py reads it (in-process or in the child)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
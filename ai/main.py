@@ -1,14 +1,14 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import json
-import torch
-import numpy as np
-from PIL import Image
+import asyncio
 import io
 import sys
 import os
-from pydantic import BaseModel
+import time
+from pydantic import BaseModel, Field
+from typing import Optional
+from contextlib import asynccontextmanager
 import base64
 
 # Set up proper directory paths
@@ -17,13 +17,132 @@ sys.path.append(current_dir)
 
 # Define output folder
 output_folder = os.path.join(current_dir, 'generated_levels')
-os.makedirs(output_folder, exist_ok=True)
 
-# Import from GAN.py
-from GAN import LevelGAN, render_layout, generate_layout, model
+# torch and the models are imported by the warmup task, not here, so the server binds immediately
+from level_render import render_level_image, pattern_to_layout
+from level_codec import pack_grid, BITSET_MEDIA_TYPE
+from asset_cache import asset_cache, BACKGROUND_PATH, BACKGROUND_SIZE, BOX_TEMPLATE_PATH, BOX_SPRITE_SIZE
+from batch_inference import BatchInferenceEngine, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS, init_worker
+from execution_backend import ExecutionBackend, BackendSaturated, DEFAULT_MAX_INFLIGHT
+from level_writer import LevelWriter, DEFAULT_QUEUE_SIZE as WRITER_DEFAULT_QUEUE_SIZE
+from result_cache import LevelResultCache, DEFAULT_MAX_ENTRIES, DEFAULT_TTL_SECONDS, DEFAULT_QUANTIZATION
+from session_cache import LSTMSessionCache, DEFAULT_MAX_SESSIONS, DEFAULT_SESSION_TTL_SECONDS
+from playability import DEFAULT_CANDIDATES
+
+# Micro-batching window: requests are coalesced for up to BATCH_MAX_WAIT_MS or BATCH_MAX_SIZE requests
+BATCH_MAX_SIZE = int(os.environ.get('LEVEL_BATCH_MAX_SIZE', DEFAULT_MAX_BATCH_SIZE))
+BATCH_MAX_WAIT_MS = float(os.environ.get('LEVEL_BATCH_MAX_WAIT_MS', DEFAULT_MAX_WAIT_MS))
+
+# Background persistence of generated levels to output_folder
+PERSIST_LEVELS = os.environ.get('LEVEL_PERSIST', '1').lower() not in ('0', 'false', 'no')
+PERSIST_QUEUE_SIZE = int(os.environ.get('LEVEL_PERSIST_QUEUE_SIZE', WRITER_DEFAULT_QUEUE_SIZE))
+
+# Execution backend for inference, compositing and PNG encoding: 'thread' or 'process'
+EXECUTOR_MODE = os.environ.get('LEVEL_EXECUTOR', 'thread')
+EXECUTOR_WORKERS = int(os.environ.get('LEVEL_EXECUTOR_WORKERS', 0)) or None
+MAX_INFLIGHT = int(os.environ.get('LEVEL_MAX_INFLIGHT', DEFAULT_MAX_INFLIGHT))
+
+# Cache of finished levels keyed on quantized (difficulty, score), seed and model version.
+# Only seeded requests are cached unless LEVEL_CACHE_UNSEEDED is set, in which case
+# unseeded requests with the same quantized settings share one level until it expires.
+CACHE_SIZE = int(os.environ.get('LEVEL_CACHE_SIZE', DEFAULT_MAX_ENTRIES))
+CACHE_TTL = float(os.environ.get('LEVEL_CACHE_TTL', DEFAULT_TTL_SECONDS))
+CACHE_QUANTIZATION = float(os.environ.get('LEVEL_CACHE_QUANTIZATION', DEFAULT_QUANTIZATION))
+CACHE_UNSEEDED = os.environ.get('LEVEL_CACHE_UNSEEDED', '0').lower() in ('1', 'true', 'yes')
+
+# LEVEL_MODEL is the model /generate-level uses: gan, lstm, or their int8-quantized gan_int8/lstm_int8.
+# LEVEL_SERVING_MODELS (comma separated, default LEVEL_MODEL) are the only ones each worker loads.
+SERVING_MODEL = os.environ.get('LEVEL_MODEL', 'gan')
+SERVING_MODELS = tuple(m.strip() for m in os.environ.get('LEVEL_SERVING_MODELS', SERVING_MODEL).split(',') if m.strip())
+
+# Requests with a session_id continue that player's LSTM sequence (see session_cache). Sessions use the
+# first lstm/lstm_int8 model in LEVEL_SERVING_MODELS and are disabled when there is none.
+SESSION_MODEL = os.environ.get('LEVEL_SESSION_MODEL') or next((m for m in SERVING_MODELS if m.startswith('lstm')), None)
+SESSION_MAX = int(os.environ.get('LEVEL_SESSION_MAX', DEFAULT_MAX_SESSIONS))
+SESSION_TTL = float(os.environ.get('LEVEL_SESSION_TTL', DEFAULT_SESSION_TTL_SECONDS))
+
+# Levels that fail the reachability check (see playability) are redrawn, keeping the first playable of
+# up to LEVEL_PLAYABLE_CANDIDATES draws per level; 1 serves every level as drawn.
+PLAYABLE_CANDIDATES = max(1, int(os.environ.get('LEVEL_PLAYABLE_CANDIDATES', DEFAULT_CANDIDATES)))
+
+# Generator inference graph: 'script' (TorchScript, default), 'compile' (torch.compile) or 'none' (eager).
+# Warmup runs one throwaway batch per power-of-two batch size up to LEVEL_BATCH_MAX_SIZE before /ready.
+COMPILE_MODE = os.environ.get('LEVEL_COMPILE', 'script')
+WARMUP_BATCH_SIZES = tuple(sorted({min(2 ** i, BATCH_MAX_SIZE) for i in range(max(BATCH_MAX_SIZE, 1).bit_length() + 1)}))
+
+level_writer = LevelWriter(output_folder, enabled=PERSIST_LEVELS, max_queue_size=PERSIST_QUEUE_SIZE)
+result_cache = LevelResultCache(max_entries=CACHE_SIZE, ttl_seconds=CACHE_TTL, quantization=CACHE_QUANTIZATION)
+level_gan = None
+backend = None
+inference_engine = None
+session_cache = None
+
+# Readiness: /generate-level answers 503 until the warmup task has loaded the model, started the
+# backend and pushed a throwaway batch through it; /ready reports the state for load balancers
+warmup_state = {'ready': False, 'error': None, 'seconds': None}
+warmup_task = None
+
+def load_serving_model(compile=True):
+    # Inference-only: just the models the API serves (memory-mapped checkpoints, eval mode),
+    # no discriminator, optimizers or training data
+    from level_gan import LevelGAN
+    level_gan = LevelGAN(inference_only=True, models=SERVING_MODELS)
+    if compile:
+        if 'gan' in SERVING_MODELS: level_gan.compile_generator(COMPILE_MODE)
+        for use_model in SERVING_MODELS:
+            level_gan.warmup(WARMUP_BATCH_SIZES, use_model=use_model)
+    return level_gan
+
+def create_backend():
+    if EXECUTOR_MODE == 'process':
+        # Workers preload a copy of the serving model's weights once
+        state_dicts = {use_model: level_gan.model_for(use_model).state_dict() for use_model in level_gan.loaded_models()}
+        return ExecutionBackend('process', max_workers=EXECUTOR_WORKERS, max_inflight=MAX_INFLIGHT,
+                                initializer=init_worker, initargs=(state_dicts, 1, COMPILE_MODE, WARMUP_BATCH_SIZES, SERVING_MODELS))
+    return ExecutionBackend(EXECUTOR_MODE, max_workers=EXECUTOR_WORKERS, max_inflight=MAX_INFLIGHT)
+
+async def warm_up():
+    global level_gan, backend, inference_engine, session_cache
+    start = time.perf_counter()
+    try:
+        # Decode and resize the sprites once before serving
+        await asyncio.to_thread(asset_cache.preload, [(BACKGROUND_PATH, BACKGROUND_SIZE), (BOX_TEMPLATE_PATH, BOX_SPRITE_SIZE)])
+        # Process workers compile and warm up their own copies; the parent only needs the weights
+        level_gan = await asyncio.to_thread(load_serving_model, EXECUTOR_MODE != 'process')
+        backend = create_backend()
+        await backend.warmup()
+        if SESSION_MODEL:
+            session_cache = LSTMSessionCache(level_gan, use_model=SESSION_MODEL, max_sessions=SESSION_MAX, ttl_seconds=SESSION_TTL)
+        inference_engine = BatchInferenceEngine(level_gan if backend.mode == 'thread' else None, max_batch_size=BATCH_MAX_SIZE,
+                                                max_wait_ms=BATCH_MAX_WAIT_MS, backend=backend, session_cache=session_cache,
+                                                candidates=PLAYABLE_CANDIDATES)
+        await inference_engine.start()
+        # First forward pass and render pay one-off allocation costs; do them before taking traffic
+        pattern = await inference_engine.generate(0.5, 0.5, use_model=SERVING_MODEL, seed=0)
+        await backend.run(render_level_image, pattern, 0.5, 'PNG')
+    except Exception as e:
+        warmup_state['error'] = str(e)
+        print(f"Warmup failed: {e}")
+        return
+    warmup_state['seconds'] = time.perf_counter() - start
+    warmup_state['ready'] = True
+    print(f"Ready after {warmup_state['seconds']:.2f}s warmup")
+
+@asynccontextmanager
+async def lifespan(app):
+    global warmup_task
+    level_writer.start()
+    warmup_task = asyncio.create_task(warm_up())
+    yield
+    if not warmup_task.done():
+        warmup_task.cancel()
+    await asyncio.gather(warmup_task, return_exceptions=True)
+    if inference_engine is not None: await inference_engine.stop()
+    if backend is not None: backend.shutdown()
+    level_writer.stop()
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Update CORS middleware configuration
 app.add_middleware(
@@ -35,103 +154,177 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
-level_gan = LevelGAN()
-
 # Define request model
 class LevelRequest(BaseModel):
     difficulty: float = 0.5
     score: float = 0.5
+    seed: Optional[int] = Field(None, ge=0)  # Makes generation reproducible (and cacheable)
+    session_id: Optional[str] = None  # Continues this player's LSTM sequence; never cached
+
+# Response formats for /generate-level, selected with ?format= or the Accept header:
+#   json   - layout, image paths and base64 PNG (default)
+#   layout - layout-only JSON, no image is rendered
+#   png    - raw PNG stream, webp - raw WebP stream
+#   bitset - 25x25 grid packed into 79 bytes (see level_codec)
+RESPONSE_FORMATS = ('json', 'layout', 'png', 'webp', 'bitset')
+ACCEPT_FORMATS = {
+    'image/png': 'png',
+    'image/webp': 'webp',
+    BITSET_MEDIA_TYPE: 'bitset',
+    'application/octet-stream': 'bitset',
+    'application/json': 'json',
+}
+IMAGE_FORMATS = {'png': ('PNG', 'image/png'), 'webp': ('WEBP', 'image/webp')}
+RENDER_FORMATS = {'json': 'PNG', 'png': 'PNG', 'webp': 'WEBP'}  # Image encoding each response format needs
+
+def parse_accept(accept):
+    # (media type, q) for each media range of an Accept header, highest q first (ties keep header order)
+    ranges = []
+    for media_range in (accept or '').split(','):
+        media_type, *params = [part.strip() for part in media_range.split(';')]
+        if not media_type: continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() != 'q': continue
+            try:
+                q = min(max(float(value), 0.0), 1.0)
+            except ValueError:
+                q = 0.0  # Malformed weights are treated as "not acceptable"
+        ranges.append((media_type.lower(), q))
+    return sorted(ranges, key=lambda item: -item[1])
+
+def negotiate_format(format, accept):
+    if format is not None:
+        if format not in RESPONSE_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown format '{format}', expected one of {', '.join(RESPONSE_FORMATS)}")
+        return format
+    ranges = parse_accept(accept)
+    for media_type, q in ranges:
+        if q > 0 and media_type in ACCEPT_FORMATS:
+            return ACCEPT_FORMATS[media_type]
+    # No listed type matched: fall back to JSON unless its most specific range has q=0
+    qualities = {}
+    for media_type, q in ranges:
+        qualities.setdefault(media_type, q)
+    for media_type in ('application/json', 'application/*', '*/*'):
+        if media_type in qualities:
+            if qualities[media_type] > 0: break
+            raise HTTPException(status_code=406, detail=f"None of the accepted media types can be served; use one of {', '.join(ACCEPT_FORMATS)}")
+    return 'json'
 
 @app.post("/generate-level")
-async def generate_level(request: LevelRequest):
+async def generate_level(request: LevelRequest, http_request: Request, format: Optional[str] = None):
     try:
+        if not warmup_state['ready']:
+            if warmup_state['error'] is not None:
+                # Retrying will not help, so no Retry-After; /ready carries the same reason
+                raise HTTPException(status_code=503, detail=f"Model failed to load: {warmup_state['error']}")
+            raise HTTPException(status_code=503, detail="Model is warming up", headers={'Retry-After': '1'})
         # Validate inputs
         if not (0 <= request.difficulty <= 1) or not (0 <= request.score <= 1):
             raise HTTPException(status_code=400, detail="Difficulty and score must be between 0 and 1")
+        response_format = negotiate_format(format, http_request.headers.get('accept'))
+        if request.session_id is not None and session_cache is None:
+            raise HTTPException(status_code=400, detail="Sessions need an LSTM model; include lstm in LEVEL_SERVING_MODELS")
+        use_model = SERVING_MODEL
+        image_format = RENDER_FORMATS.get(response_format)
+        image_ext = image_format.lower() if image_format else None
         
-        # Generate pattern using LevelGAN
-        pattern = level_gan.generate_level(request.difficulty, request.score, use_model='gan')
+        # Cached levels are generated from the quantized settings, so a hit is exactly what a miss would produce
+        difficulty, score, cache_key, entry, session_step = request.difficulty, request.score, None, None, None
+        if result_cache.enabled and request.session_id is None and (request.seed is not None or CACHE_UNSEEDED):
+            difficulty, score = result_cache.quantize(request.difficulty), result_cache.quantize(request.score)
+            cache_key = result_cache.key(difficulty, score, request.seed, level_gan.model_version(use_model))
+            entry = result_cache.get(cache_key)
+        cache_status = 'hit' if entry is not None else 'miss'
+        level_name = f'level_d{difficulty:.3f}_s{score:.3f}'
         
-        # Convert pattern to layout format and save layout data
-        layout = []
-        grid_rows = 25
-        grid_cols = 25
-        box_size = 32
+        if entry is None or (image_format and image_format not in entry['images']):
+            with backend.admit():
+                if entry is None:
+                    # Generate pattern using LevelGAN; session requests advance that session's LSTM state
+                    if request.session_id is not None:
+                        pattern, session_step = await inference_engine.generate_for_session(request.session_id, difficulty, score, seed=request.seed)
+                    else:
+                        pattern = await inference_engine.generate(difficulty, score, use_model=use_model, seed=request.seed)
+                    entry = {'pattern': pattern, 'layout': pattern_to_layout(pattern), 'images': {}, 'paths': {}}
+                    if not image_format:
+                        # Grid-only formats skip compositing and image encoding entirely
+                        entry['paths'][None] = level_writer.submit(level_name, entry['layout'])
+                if image_format:
+                    # Compositing (connecting platforms above difficulty 0.5) and image encoding run on the backend;
+                    # the same bytes go to the client and to the background writer
+                    _, image_bytes = await backend.run(render_level_image, entry['pattern'], difficulty, image_format)
+                    entry['images'][image_format] = image_bytes
+                    entry['paths'][image_ext] = level_writer.submit(level_name, entry['layout'], image_bytes, image_ext)
+            if cache_key is not None: result_cache.put(cache_key, entry)
         
-        # Convert 1D pattern to 2D grid
-        pattern_2d = pattern.reshape(grid_rows, grid_cols)
+        # Persistence happens off the request path (paths are None when disabled or dropped)
+        pattern, layout = entry['pattern'], entry['layout']
+        image_bytes = entry['images'].get(image_format)
+        persisted = entry['paths'].get(image_ext) or entry['paths'].get(None)
+        layout_txt_path, image_path = persisted if persisted else (None, None)
         
-        # Create layout from pattern
-        for y in range(grid_rows):
-            for x in range(grid_cols):
-                if pattern_2d[y, x] > 0.5:  # Threshold for platform placement
-                    pos_x = x * box_size
-                    pos_y = y * box_size
-                    layout.append({
-                        'x': int(pos_x),
-                        'y': int(pos_y),
-                        'type': 'solid'
-                    })
-
-        # Save layout data to file
-        layout_filename = f'level_d{request.difficulty:.3f}_s{request.score:.3f}.txt'
-        layout_txt_path = os.path.join(output_folder, layout_filename)
-        with open(layout_txt_path, 'w') as f:
-            json.dump(layout, f, indent=2)
-
-        # Create image buffer
-        img_byte_arr = io.BytesIO()
+        headers = {'X-Cache': cache_status}
+        if session_step is not None: headers['X-Session-Step'] = str(session_step)
+        if response_format == 'layout':
+            return JSONResponse(content={"layout": layout}, headers=headers)
         
-        # Initialize background and box images
-        bg = Image.open(os.path.join(current_dir, 'assets/space_background.png')).convert('RGBA')
-        bg = bg.resize((800, 800))
+        if response_format == 'bitset':
+            return Response(content=pack_grid(pattern), media_type=BITSET_MEDIA_TYPE, headers=headers)
         
-        box = Image.open(os.path.join(current_dir, 'assets/box_template.png')).convert("RGBA")
-        box = box.resize((32, 32))
-        
-        # Place boxes according to layout
-        for block in layout:
-            pos_x = block['x']
-            pos_y = block['y']
-            bg.paste(box, (pos_x, pos_y), box)
-            
-            # Add connecting platforms based on difficulty
-            if request.difficulty > 0.5:
-                # Add vertical connections
-                if any(b['x'] == pos_x and abs(b['y'] - pos_y) == box_size for b in layout):
-                    bg.paste(box, (pos_x, pos_y + box_size), box)
-                
-                # Add horizontal connections
-                if any(b['y'] == pos_y and abs(b['x'] - pos_x) == box_size for b in layout):
-                    bg.paste(box, (pos_x + box_size, pos_y), box)
-
-        # Save the final image to BytesIO and local file
-        bg.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
-        
-        # Save image to local file
-        image_filename = f'level_d{request.difficulty:.3f}_s{request.score:.3f}.png'
-        image_path = os.path.join(output_folder, image_filename)
-        bg.save(image_path, format='PNG')
-        
-        # Read the layout data
-        with open(layout_txt_path, 'r') as f:
-            layout_data = json.load(f)
+        if response_format in IMAGE_FORMATS:
+            headers['X-Level-Grid'] = base64.b64encode(pack_grid(pattern)).decode('ascii')
+            if layout_txt_path: headers['X-Layout-Path'] = layout_txt_path
+            if image_path: headers['X-Image-Path'] = image_path
+            return StreamingResponse(io.BytesIO(image_bytes), media_type=IMAGE_FORMATS[response_format][1], headers=headers)
         
         # Return both image and layout data in the response
         response = {
-            "layout": layout_data,
+            "layout": layout,
             "layout_path": layout_txt_path,
             "image_path": image_path,
-            "image": base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
+            "image": base64.b64encode(image_bytes).decode('utf-8')
         }
+        if session_step is not None: response["session_step"] = session_step
         
-        return JSONResponse(content=response)
+        return JSONResponse(content=response, headers=headers)
     
+    except BackendSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={'Retry-After': str(e.retry_after)})
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error generating level: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate level: {str(e)}")
 
+@app.delete("/sessions/{session_id}")
+async def reset_session(session_id: str):
+    # Forget a session's LSTM state; its next level starts a fresh sequence
+    if session_cache is None:
+        raise HTTPException(status_code=404, detail="Sessions are not enabled")
+    return JSONResponse(content={"session_id": session_id, "reset": session_cache.reset(session_id)})
+
+@app.get("/ready")
+async def ready():
+    # 200 once the model is loaded and warmed up, 503 while warming up or if warmup failed
+    return JSONResponse(content=dict(warmup_state), status_code=200 if warmup_state['ready'] else 503)
+
+@app.get("/metrics")
+async def metrics():
+    # Queue depth, batch-size histogram and per-stage latency of the inference queue,
+    # plus back-pressure of the background level writer
+    if not warmup_state['ready']:
+        return JSONResponse(content={'ready': False, 'writer': level_writer.stats(), 'cache': result_cache.stats()})
+    stats = inference_engine.stats()
+    stats['writer'] = level_writer.stats()
+    stats['backend'] = backend.stats()
+    stats['cache'] = result_cache.stats()
+    stats['model'] = level_gan.memory_footprint()
+    if session_cache is not None: stats['sessions'] = session_cache.stats()
+    return JSONResponse(content=stats)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=5000)
\ No newline at end of file
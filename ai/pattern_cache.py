@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from level_gan import PATTERN_SIZE, binarize_level_image, binary_to_patterns
+from level_codec import pack_patterns, unpack_patterns, PACKED_SIZE
+
+# Persistent cache of preprocessed level patterns.
+# Patterns are stored bit-packed in a single .npz next to a manifest of (filename, size,
+# mtime). On load only new or changed images are decoded; a large batch of misses is spread
+# over a process pool. Warm-cache startup cost no longer scales with decoding the corpus.
+
+CACHE_FILENAME = 'pattern_cache.npz'
+PARALLEL_THRESHOLD = 64  # Below this many misses a process pool costs more than it saves
+
+
+def pattern_from_file(path):
+    img = cv2.imread(path)
+    if img is None:
+        print(f"Warning: Could not read image {path}. Returning empty pattern.")
+        return None
+    pattern = binary_to_patterns(binarize_level_image(img)[None])[0]
+    if pattern.sum() == 0:
+        print(f"Warning: No platforms detected in {path} after processing.")
+    return pattern
+
+
+def _read_cache(cache_path):
+    if not os.path.exists(cache_path): return {}
+    try:
+        with np.load(cache_path) as data:
+            patterns = unpack_patterns(data['patterns']).astype(np.float64)
+            return {name: (int(size), int(mtime), pattern)
+                    for name, size, mtime, pattern in zip(data['filenames'], data['sizes'], data['mtimes'], patterns)}
+    except Exception as e:
+        print(f"Warning: Ignoring unreadable pattern cache {cache_path}: {e}")
+        return {}
+
+
+def _write_cache(cache_path, entries):
+    names = sorted(entries)
+    patterns = (pack_patterns(np.stack([entries[name][2] for name in names])) if names
+                else np.zeros((0, PACKED_SIZE), dtype=np.uint8))
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + '.tmp.npz'
+    np.savez(tmp_path, filenames=np.array(names, dtype=str), sizes=np.array([entries[n][0] for n in names], dtype=np.int64),
+             mtimes=np.array([entries[n][1] for n in names], dtype=np.int64), patterns=patterns)
+    os.replace(tmp_path, cache_path)
+
+
+def load_patterns(data_folder, filenames, cache_path, workers=None):
+    # Returns {filename: pattern} for the given files in data_folder, using and refreshing the cache.
+    # Unreadable images map to an all-zero pattern (and stay cached until the file changes).
+    cached = _read_cache(cache_path)
+    entries, misses = {}, []
+    for filename in filenames:
+        stat = os.stat(os.path.join(data_folder, filename))
+        key = (stat.st_size, stat.st_mtime_ns)
+        hit = cached.get(filename)
+        if hit is not None and hit[:2] == key:
+            entries[filename] = hit
+        else:
+            misses.append((filename, key))
+
+    if misses:
+        paths = [os.path.join(data_folder, filename) for filename, _ in misses]
+        workers = workers or os.cpu_count() or 1
+        if len(misses) >= PARALLEL_THRESHOLD and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                patterns = list(pool.map(pattern_from_file, paths, chunksize=16))
+        else:
+            patterns = [pattern_from_file(path) for path in paths]
+        for (filename, key), pattern in zip(misses, patterns):
+            if pattern is None: pattern = np.zeros(PATTERN_SIZE, dtype=np.float32)
+            entries[filename] = key + (pattern,)
+
+    if misses or len(entries) != len(cached):
+        try:
+            _write_cache(cache_path, entries)
+        except Exception as e:
+            print(f"Warning: Could not write pattern cache {cache_path}: {e}")
+    print(f"Pattern cache: {len(filenames) - len(misses)} cached, {len(misses)} processed")
+    return {filename: entry[2] for filename, entry in entries.items()}
+
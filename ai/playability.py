@@ -0,0 +1,156 @@
+import numpy as np
+
+from level_constants import GRID_ROWS, GRID_COLS, SAFE_ZONE_ROWS, PATTERN_SIZE
+from level_render import PLATFORM_THRESHOLD
+
+# Batched reachability check for 25x25 levels and a rejection-sampling stage for generation.
+# The player enters from the safe zone (its top edge acts as the floor) and can stand on any
+# free cell directly above a platform. From a standing cell a jump reaches every free cell
+# covered by the jump kernel (centred on the player, rows above are negative offsets); from any
+# reached cell the player falls straight down to the next platform. Reachable standing cells
+# are grown by repeated dilation of the whole (N, 25, 25) batch until nothing changes.
+# A level is playable when a platform in its highest platform row can be stood on.
+# Platforms do not block jumps; the check is about gaps and heights, not collisions.
+
+JUMP_HEIGHT = 5  # Rows; the first easy-tier platform is 5 rows above the safe zone
+JUMP_WIDTH = 4  # Columns either side
+DEFAULT_CANDIDATES = 8
+START_ROW = GRID_ROWS - SAFE_ZONE_ROWS - 1  # Lowest row above the safe zone
+
+
+def jump_kernel(height=JUMP_HEIGHT, width=JUMP_WIDTH):
+    # Cells reachable in one jump: up to `height` rows up and `width` columns either side
+    kernel = np.zeros((2 * height + 1, 2 * width + 1), dtype=bool)
+    kernel[:height + 1] = True
+    return kernel
+
+
+DEFAULT_KERNEL = jump_kernel()
+
+
+def to_platform_grids(patterns, threshold=PLATFORM_THRESHOLD):
+    patterns = np.asarray(patterns)
+    if patterns.dtype != bool: patterns = patterns > threshold
+    return patterns.reshape(-1, GRID_ROWS, GRID_COLS)
+
+
+# Levels are handled as bitboards: one integer per row, bit c set for column c
+COLUMN_BITS = np.int64(1) << np.arange(GRID_COLS, dtype=np.int64)
+ALL_COLUMNS = (1 << GRID_COLS) - 1
+
+
+def to_bitboards(grids):
+    return grids.astype(np.int64) @ COLUMN_BITS
+
+
+def from_bitboards(bits):
+    return (bits[..., None] & COLUMN_BITS) != 0
+
+
+def _or_shifted_rows(out, bits, dy):
+    # out |= bits moved down by dy rows (up for dy < 0), in place
+    if dy >= 0: out[:, dy:] |= bits[:, :GRID_ROWS - dy]
+    else: out[:, :dy] |= bits[:, -dy:]
+    return out
+
+
+def _shift_columns(bits, dx):
+    return (bits << dx) & ALL_COLUMNS if dx >= 0 else bits >> -dx
+
+
+def _kernel_plan(kernel):
+    # (row offset, column offsets) per non-empty kernel row, relative to the player
+    center_y, center_x = kernel.shape[0] // 2, kernel.shape[1] // 2
+    return [(row - center_y, tuple(np.flatnonzero(kernel[row]) - center_x))
+            for row in range(kernel.shape[0]) if kernel[row].any()]
+
+
+def _dilate(bits, plan):
+    # Every cell one jump away from a set cell; kernel rows with the same column offsets share
+    # one horizontal pass, so a rectangular kernel costs height + width shifts
+    spreads, out = {}, np.zeros_like(bits)
+    for dy, offsets in plan:
+        if offsets not in spreads:
+            spread = np.zeros_like(bits)
+            for dx in offsets: spread |= _shift_columns(bits, dx)
+            spreads[offsets] = spread
+        _or_shifted_rows(out, spreads[offsets], dy)
+    return out
+
+
+def _fall(bits, free):
+    # Cells below a set cell in the same column with only free cells in between (log-step fill)
+    bits, free = bits.copy(), free.copy()
+    span = 1
+    while span < GRID_ROWS:
+        bits[:, span:] |= free[:, span:] & bits[:, :-span]
+        free[:, span:] &= free[:, :-span]
+        free[:, :span] = 0
+        span *= 2
+    return bits
+
+
+def _reachable_bits(platforms, kernel=None):
+    kernel = DEFAULT_KERNEL if kernel is None else np.asarray(kernel, dtype=bool)
+    plan = _kernel_plan(kernel)
+    free = ~platforms & ALL_COLUMNS
+    standing = free & _or_shifted_rows(np.zeros_like(platforms), platforms, -1)
+    standing[:, START_ROW:] = free[:, START_ROW:]  # Anywhere on the floor of the safe zone and inside it
+    reached = np.zeros_like(platforms)
+    reached[:, START_ROW:] = free[:, START_ROW:]
+    for _ in range(GRID_ROWS * GRID_COLS):
+        grown = reached | (standing & _fall(_dilate(reached, plan) & free, free))
+        if np.array_equal(grown, reached): break
+        reached = grown
+    return reached
+
+
+def reachable_cells(patterns, kernel=None):
+    # (N, 25, 25) mask of the standing cells the player can get to
+    return from_bitboards(_reachable_bits(to_bitboards(to_platform_grids(patterns)), kernel))
+
+
+def is_playable(patterns, kernel=None):
+    # (N,) booleans: the highest row holding a platform has a reachable standing cell on top.
+    # Levels without platforms count as playable.
+    platforms = to_bitboards(to_platform_grids(patterns))
+    reached = _reachable_bits(platforms, kernel)
+    has_platforms = (platforms != 0).any(axis=1)
+    top = np.argmax(platforms != 0, axis=1)
+    levels = np.arange(len(platforms))
+    on_top = reached[levels, np.maximum(top - 1, 0)] & platforms[levels, top]
+    return ~has_platforms | ((top > 0) & (on_top != 0))
+
+
+def candidate_seeds(seeds, count, candidate):
+    # Seeds of retry `candidate` (1, 2, ...); unseeded levels keep drawing fresh entropy
+    seeds = [None] * count if seeds is None else list(seeds)
+    return [None if seed is None else [seed, candidate] for seed in seeds]
+
+
+def post_process_playable(raw_patterns, difficulties, scores, seeds=None, candidates=DEFAULT_CANDIDATES, kernel=None):
+    # post_process_patterns with rejection sampling: each level is post-processed with its own seed
+    # first; levels that fail is_playable get candidates - 1 more draws in one batch and keep the
+    # first playable one (or the last candidate if none is). Returns (patterns, playable).
+    from level_gan import post_process_patterns
+    difficulties = np.asarray(difficulties, dtype=np.float64).reshape(-1)
+    scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+    raw_patterns = np.asarray(raw_patterns).reshape(len(difficulties), PATTERN_SIZE)
+    patterns = post_process_patterns(raw_patterns, difficulties, scores, seeds=seeds)
+    playable = is_playable(patterns, kernel)
+    failed = np.flatnonzero(~playable)
+    if len(failed) == 0 or candidates <= 1:
+        return patterns, playable
+
+    retries = candidates - 1
+    failed_seeds = [None if seeds is None else seeds[i] for i in failed]
+    retry_seeds = [seed for k in range(1, candidates) for seed in candidate_seeds(failed_seeds, len(failed), k)]
+    retry_patterns = post_process_patterns(np.tile(raw_patterns[failed], (retries, 1)), np.tile(difficulties[failed], retries),
+                                           np.tile(scores[failed], retries), seeds=retry_seeds)
+    retry_playable = is_playable(retry_patterns, kernel).reshape(retries, len(failed))
+    retry_patterns = retry_patterns.reshape(retries, len(failed), PATTERN_SIZE)
+    # First playable retry per level, else the last one
+    choice = np.where(retry_playable.any(axis=0), np.argmax(retry_playable, axis=0), retries - 1)
+    patterns[failed] = retry_patterns[choice, np.arange(len(failed))]
+    playable[failed] = retry_playable[choice, np.arange(len(failed))]
+    return patterns, playable
@@ -0,0 +1,90 @@
+# Int8 quantization report
+# Compares the dynamically quantized generator/LSTM (use_model='gan_int8' / 'lstm_int8') with
+# fp32 on a difficulty x score grid: agreement of the thresholded raw 25x25 patterns, per-batch
+# CPU latency and weight size. Post-processed levels are not compared: post_process_patterns
+# builds them from the condition and seed alone, so they match whatever the model outputs.
+# Exits with status 1 when the raw cell agreement of a model is below --min-agreement.
+#
+# Examples:
+#   python quantization_report.py
+#   python quantization_report.py --models gan --grid 51 --batch-sizes 1,32 --json quant.json
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from inference_benchmark import time_batches
+
+DEFAULT_MIN_AGREEMENT = 0.99
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate int8 dynamic quantization against fp32.")
+    parser.add_argument('--models', default='gan,lstm', help="Comma separated base models to check")
+    parser.add_argument('--grid', type=int, default=41, help="Points per axis of the difficulty x score grid")
+    parser.add_argument('--batch-sizes', default='1,8,32,128', help="Comma separated batch sizes to time")
+    parser.add_argument('--repeats', type=int, default=300, help="Timed forward passes per batch size")
+    parser.add_argument('--threads', type=int, default=1, help="torch intra-op threads")
+    parser.add_argument('--min-agreement', type=float, default=DEFAULT_MIN_AGREEMENT,
+                        help="Lowest acceptable fraction of agreeing thresholded raw cells")
+    parser.add_argument('--json', help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    import torch
+    from level_gan import LevelGAN, QUANTIZED_SUFFIX, serialized_size
+    from level_render import PLATFORM_THRESHOLD
+    torch.set_num_threads(args.threads)
+    bases = [name.strip() for name in args.models.split(',') if name.strip()]
+    level_gan = LevelGAN(inference_only=True, models=tuple(bases))
+
+    axis = np.linspace(0, 1, args.grid)
+    conditions = np.array([[d, s] for d in axis for s in axis])
+    report = {'threads': args.threads, 'grid': args.grid, 'min_agreement': args.min_agreement, 'models': {}}
+    failed = []
+    for base in bases:
+        quantized = base + QUANTIZED_SUFFIX
+        fp32_raw = level_gan.generate_raw_patterns(conditions, use_model=base)
+        int8_raw = level_gan.generate_raw_patterns(conditions, use_model=quantized)
+        fp32_cells, int8_cells = fp32_raw > PLATFORM_THRESHOLD, int8_raw > PLATFORM_THRESHOLD
+        fp32_bytes = serialized_size(level_gan.model_for(base))
+        int8_bytes = serialized_size(level_gan.model_for(quantized))
+        result = {
+            'raw_cell_agreement': float((fp32_cells == int8_cells).mean()),
+            'raw_pattern_agreement': float((fp32_cells == int8_cells).all(axis=1).mean()),
+            'max_abs_diff': float(np.abs(fp32_raw - int8_raw).max()),
+            'fp32_bytes': fp32_bytes,
+            'int8_bytes': int8_bytes,
+            'batches': {},
+        }
+        for size in [int(size) for size in args.batch_sizes.split(',')]:
+            batch = conditions[np.random.default_rng(size).integers(0, len(conditions), size)]
+            runners = {name: (lambda c, name=name: level_gan.generate_raw_patterns(c, use_model=name)) for name in (base, quantized)}
+            for run in runners.values(): run(batch)  # Warm up
+            latencies = time_batches(runners, batch, args.repeats)
+            fp32_ms, int8_ms = np.percentile(latencies[base], 50), np.percentile(latencies[quantized], 50)
+            result['batches'][size] = {'fp32_p50_ms': float(fp32_ms), 'int8_p50_ms': float(int8_ms), 'speedup': float(fp32_ms / int8_ms)}
+        report['models'][base] = result
+        if result['raw_cell_agreement'] < args.min_agreement: failed.append(base)
+
+        print(f"\n{base} vs {quantized} ({len(conditions)} settings)")
+        print(f"  thresholded raw cells agree:    {result['raw_cell_agreement']:.4%} "
+              f"(whole patterns {result['raw_pattern_agreement']:.2%}), max |diff| {result['max_abs_diff']:.4f}")
+        print(f"  weights: {fp32_bytes / 1024:.0f} KiB -> {int8_bytes / 1024:.0f} KiB ({fp32_bytes / int8_bytes:.1f}x smaller)")
+        for size, stats in result['batches'].items():
+            print(f"  batch {size:>4}: fp32 {stats['fp32_p50_ms']:.3f} ms, int8 {stats['int8_p50_ms']:.3f} ms ({stats['speedup']:.2f}x)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if failed:
+        print(f"\nRaw cell agreement below {args.min_agreement:.2%}: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Persistent cache of raw level ratings (before corpus normalization), keyed by a hash of the
+# image bytes, so renamed or copied levels are not rated again. A (filename, size, mtime) index
+# next to it skips re-hashing unchanged files. Only new content is decoded and rated; a large
+# batch of misses is spread over a process pool.
+
+CACHE_FILENAME = 'ratings_cache.npz'
+PARALLEL_THRESHOLD = 32  # Below this many misses a process pool costs more than it saves
+
+
+def content_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def rate_file(path):
+    # Worker task: raw (difficulty, score) for one image, NaN when it cannot be rated
+    from level_ratings import analyze_level_pattern
+    difficulty, score = analyze_level_pattern(path)
+    if difficulty is None or score is None: return np.nan, np.nan
+    return float(difficulty), float(score)
+
+
+def _read_cache(cache_path):
+    if not os.path.exists(cache_path): return {}, {}
+    try:
+        with np.load(cache_path) as data:
+            ratings = {h: (d, s) for h, d, s in zip(data['hashes'].tolist(), data['difficulties'].tolist(), data['scores'].tolist())}
+            files = {name: (size, mtime, h) for name, size, mtime, h in
+                     zip(data['filenames'].tolist(), data['sizes'].tolist(), data['mtimes'].tolist(), data['file_hashes'].tolist())}
+            return ratings, files
+    except Exception as e:
+        print(f"Warning: Ignoring unreadable ratings cache {cache_path}: {e}")
+        return {}, {}
+
+
+def _write_cache(cache_path, ratings, files):
+    hashes = sorted(ratings)
+    names = sorted(files)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + '.tmp.npz'
+    np.savez(tmp_path, hashes=np.array(hashes, dtype=str),
+             difficulties=np.array([ratings[h][0] for h in hashes], dtype=np.float64),
+             scores=np.array([ratings[h][1] for h in hashes], dtype=np.float64),
+             filenames=np.array(names, dtype=str), sizes=np.array([files[n][0] for n in names], dtype=np.int64),
+             mtimes=np.array([files[n][1] for n in names], dtype=np.int64),
+             file_hashes=np.array([files[n][2] for n in names], dtype=str))
+    os.replace(tmp_path, cache_path)
+
+
+def load_ratings(data_folder, filenames, cache_path, workers=None):
+    # Returns {filename: (difficulty, score)} raw ratings for the given files in data_folder, using
+    # and refreshing the cache. Images that cannot be rated map to (nan, nan).
+    cached_ratings, cached_files = _read_cache(cache_path)
+    files = {}
+    for filename in filenames:
+        stat = os.stat(os.path.join(data_folder, filename))
+        hit = cached_files.get(filename)
+        if hit is not None and hit[:2] == (stat.st_size, stat.st_mtime_ns):
+            files[filename] = hit
+        else:
+            files[filename] = (stat.st_size, stat.st_mtime_ns, content_hash(os.path.join(data_folder, filename)))
+
+    # One rating per distinct content
+    misses = {}
+    for filename, (_, _, h) in files.items():
+        if h not in cached_ratings and h not in misses: misses[h] = filename
+    ratings = {h: cached_ratings[h] for _, _, h in files.values() if h in cached_ratings}
+    if misses:
+        paths = [os.path.join(data_folder, filename) for filename in misses.values()]
+        workers = workers or os.cpu_count() or 1
+        if len(misses) >= PARALLEL_THRESHOLD and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                rated = list(pool.map(rate_file, paths, chunksize=8))
+        else:
+            rated = [rate_file(path) for path in paths]
+        ratings.update(zip(misses, rated))
+
+    if misses or files != cached_files or len(ratings) != len(cached_ratings):
+        try:
+            _write_cache(cache_path, ratings, files)
+        except Exception as e:
+            print(f"Warning: Could not write ratings cache {cache_path}: {e}")
+    rated_files = sum(1 for _, _, h in files.values() if h in misses)
+    print(f"Ratings cache: {len(files) - rated_files} cached, {rated_files} rated")
+    return {filename: ratings[h] for filename, (_, _, h) in files.items()}
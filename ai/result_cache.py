@@ -0,0 +1,86 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+# LRU/TTL cache of finished levels (pattern, layout and encoded images), keyed on the
+# quantized (difficulty, score), the seed and the model version. Generation with the same
+# key is deterministic, so a hit can be served without touching the model.
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_SECONDS = 3600.0
+DEFAULT_QUANTIZATION = 0.01
+
+
+class LevelResultCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, quantization=DEFAULT_QUANTIZATION):
+        if quantization <= 0: raise ValueError("quantization must be positive.")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.quantization = quantization
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def quantize(self, value):
+        # Snap to the cache grid; levels are generated from the quantized value so hits are exact.
+        # Grid points stay put and anything between two of them goes to the middle of its cell, so
+        # comparisons against thresholds on the grid (tiers at 0.3/0.7, connections above 0.5,
+        # score bands above 0.4/0.6) come out the same as for the exact value.
+        steps = value / self.quantization
+        nearest = round(steps)
+        if abs(steps - nearest) < 1e-9: return min(1.0, max(0.0, round(nearest * self.quantization, 6)))
+        return min(1.0, max(0.0, round((math.floor(steps) + 0.5) * self.quantization, 6)))
+
+    def key(self, difficulty, score, seed, model_version):
+        return (self.quantize(difficulty), self.quantize(score), seed, model_version)
+
+    def get(self, key):
+        if not self.enabled: return None
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and self.ttl_seconds and time.monotonic() - item[0] > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, entry):
+        if not self.enabled: return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'quantization': self.quantization,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from level_constants import PATTERN_SIZE
+
+# Per-session LevelLSTM state for campaign-style generation.
+# Each session keeps its (h, c) tensors between levels, so level N+1 advances the recurrent state
+# by one step instead of starting a fresh sequence. Steps for many sessions are stacked into one
+# LSTM call. Sessions are evicted least-recently-used beyond `max_sessions` or after
+# `ttl_seconds` idle; an evicted or unknown session starts again from a zero state.
+
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_SESSION_TTL_SECONDS = 1800.0
+
+
+def _rounds(session_ids):
+    # Split batch rows so every session appears at most once per round; a session that is
+    # requested several times in one batch advances once per round, in request order
+    rounds, seen = [], {}
+    for row, session_id in enumerate(session_ids):
+        occurrence = seen.get(session_id, 0)
+        seen[session_id] = occurrence + 1
+        if occurrence == len(rounds): rounds.append([])
+        rounds[occurrence].append(row)
+    return rounds
+
+
+class LSTMSessionCache:
+    def __init__(self, level_gan, use_model='lstm', max_sessions=DEFAULT_MAX_SESSIONS, ttl_seconds=DEFAULT_SESSION_TTL_SECONDS):
+        self.level_gan = level_gan
+        self.use_model = use_model
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()  # session_id -> (last_used, (h, c) each (num_layers, hidden_size), steps)
+        self._lock = threading.Lock()  # Session table and counters
+        self._step_lock = threading.Lock()  # Serializes step() calls
+        self.started = 0
+        self.resumed = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.steps = 0
+        self.batches = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _lookup(self, session_id, now):
+        item = self._sessions.get(session_id)
+        if item is not None and self.ttl_seconds and now - item[0] > self.ttl_seconds:
+            del self._sessions[session_id]
+            self.expirations += 1
+            item = None
+        if item is None:
+            self.started += 1
+            return None, 0
+        self.resumed += 1
+        return item[1], item[2]
+
+    def step(self, session_ids, conditions):
+        # Advances each session by one level; returns raw (B, 625) patterns and each session's new step count
+        conditions = np.asarray(conditions, dtype=np.float64).reshape(-1, 2)
+        raw_patterns, steps = [None] * len(session_ids), [0] * len(session_ids)
+        # Steps run one at a time so every round sees the states stored by the previous one. _lock
+        # only covers the session table, so stats()/reset() never wait for the LSTM call.
+        with self._step_lock:
+            for rows in _rounds(session_ids):
+                with self._lock:
+                    now = time.monotonic()
+                    states = [self._lookup(session_ids[row], now) for row in rows]
+                # Stack the stored states along the batch dimension; new sessions start from zeros
+                h, c = self.level_gan.lstm.init_hidden(len(rows))
+                h, c = h.cpu(), c.cpu()
+                for i, (state, _) in enumerate(states):
+                    if state is not None: h[:, i], c[:, i] = state
+                outputs, (h, c) = self.level_gan.lstm_step(conditions[rows], (h, c), use_model=self.use_model)
+                h, c = h.cpu(), c.cpu()
+                with self._lock:
+                    for i, row in enumerate(rows):
+                        steps[row] = states[i][1] + 1
+                        raw_patterns[row] = outputs[i]
+                        self._sessions[session_ids[row]] = (now, (h[:, i].clone(), c[:, i].clone()), steps[row])
+                        self._sessions.move_to_end(session_ids[row])
+                    while len(self._sessions) > self.max_sessions:
+                        self._sessions.popitem(last=False)
+                        self.evictions += 1
+            with self._lock:
+                self.steps += len(session_ids)
+                self.batches += 1
+        return np.stack(raw_patterns) if raw_patterns else np.zeros((0, PATTERN_SIZE)), steps
+
+    def generate(self, session_ids, difficulties, scores, seeds=None, candidates=1):
+        # Post-processed next level per session; returns (patterns, steps, stage timings).
+        # With candidates > 1 unplayable levels are redrawn (see playability.post_process_playable).
+        from level_gan import post_process_patterns
+        from playability import post_process_playable
+        difficulties = np.asarray(difficulties, dtype=np.float64).reshape(-1)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+        start = time.perf_counter()
+        raw_patterns, steps = self.step(session_ids, np.stack([difficulties, scores], axis=1))
+        inferred_at = time.perf_counter()
+        if candidates > 1:
+            patterns = list(post_process_playable(raw_patterns, difficulties, scores, seeds=seeds, candidates=candidates)[0])
+        else:
+            patterns = list(post_process_patterns(raw_patterns, difficulties, scores, seeds=seeds))
+        done_at = time.perf_counter()
+        return patterns, steps, {'inference': inferred_at - start, 'post_process': done_at - inferred_at}
+
+    def reset(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'model': self.use_model,
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'ttl_seconds': self.ttl_seconds,
+                'started': self.started,
+                'resumed': self.resumed,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'steps': self.steps,
+                'batches': self.batches,
+            }
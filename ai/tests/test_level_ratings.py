@@ -0,0 +1,45 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from level_ratings import analyze_level_pattern, levels_folder, rate_blocks
+
+LEVEL_FILES = sorted(f for f in os.listdir(levels_folder) if f.endswith('.png'))
+
+
+def extract_blocks_contours(img):
+    # The original per-contour implementation that extract_blocks replaced
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    blocks = []
+    total_area = 0
+    unique_colors = set()
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        area = cv2.contourArea(contour)
+        mask = np.zeros(img.shape[:2], np.uint8)
+        cv2.drawContours(mask, [contour], -1, 255, -1)
+        mean_color = cv2.mean(img, mask=mask)[:3]  # BGR values
+        unique_colors.add(tuple(int(c) for c in mean_color))
+        total_area += area
+        blocks.append((x, y, w, h, area))
+    return blocks, total_area, len(unique_colors)
+
+
+def analyze_level_pattern_contours(image_path):
+    img = cv2.imread(image_path)
+    if img is None:
+        return None, None
+    blocks, total_area, color_variety = extract_blocks_contours(img)
+    if not blocks:
+        return None, None
+    return rate_blocks(blocks, total_area, color_variety, img.shape)
+
+
+@pytest.mark.parametrize('filename', LEVEL_FILES)
+def test_rating_matches_contour_implementation(filename):
+    image_path = os.path.join(levels_folder, filename)
+    assert analyze_level_pattern(image_path) == analyze_level_pattern_contours(image_path)
@@ -0,0 +1,35 @@
+import pytest
+from fastapi import HTTPException
+
+from main import negotiate_format
+
+
+@pytest.mark.parametrize('accept, expected', [
+    (None, 'json'),
+    ('image/png', 'png'),
+    ('image/png, image/webp', 'png'),
+    ('image/png;q=0.5, image/webp', 'webp'),
+    ('image/webp;q=0.8, application/x-level-bitset;q=0.9, image/png;q=0.1', 'bitset'),
+    ('application/json;q=0.2, IMAGE/PNG ; q=0.9', 'png'),
+    ('image/png;q=0, image/webp;q=0.1', 'webp'),
+    ('image/png;q=0', 'json'),
+    ('image/png;level=1;q=0.4, image/webp;q=0.3', 'png'),
+    ('text/html, */*;q=0.8', 'json'),
+    ('image/png;q=oops, image/webp;q=0.2', 'webp'),
+])
+def test_accept_header_picks_highest_q(accept, expected):
+    assert negotiate_format(None, accept) == expected
+
+
+@pytest.mark.parametrize('accept', ['application/json;q=0', 'image/png;q=0, */*;q=0', 'text/html, application/*;q=0'])
+def test_refused_json_fallback_is_not_acceptable(accept):
+    with pytest.raises(HTTPException) as error:
+        negotiate_format(None, accept)
+    assert error.value.status_code == 406
+
+
+def test_format_parameter_overrides_accept():
+    assert negotiate_format('layout', 'image/png') == 'layout'
+    with pytest.raises(HTTPException) as error:
+        negotiate_format('gif', None)
+    assert error.value.status_code == 400
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from level_constants import PATTERN_SIZE
+from level_gan import post_process_patterns
+from result_cache import LevelResultCache
+
+THRESHOLDS = (0.3, 0.4, 0.5, 0.6, 0.7)
+
+
+@pytest.mark.parametrize('threshold', THRESHOLDS)
+@pytest.mark.parametrize('offset', (-0.004, -1e-4, 0.0, 1e-4, 0.004))
+def test_quantize_keeps_threshold_side(threshold, offset):
+    cache = LevelResultCache()
+    value = threshold + offset
+    quantized = cache.quantize(value)
+    assert (quantized < threshold) == (value < threshold)
+    assert (quantized > threshold) == (value > threshold)
+
+
+def test_quantize_grid():
+    cache = LevelResultCache()
+    assert cache.quantize(0.3) == 0.3
+    assert cache.quantize(0.2999) == 0.295
+    assert cache.quantize(0.0) == 0.0
+    assert cache.quantize(1.0) == 1.0
+    assert cache.quantize(0.9999) == 0.995
+    assert cache.quantize(0.2901) == cache.quantize(0.2999)
+
+
+@pytest.mark.parametrize('difficulty, score', [(0.2999, 0.5), (0.6999, 0.5), (0.5, 0.3999), (0.5, 0.5999)])
+def test_seeded_level_just_below_threshold_keeps_its_tier(difficulty, score):
+    # The cached (quantized) request must produce the level the exact settings produce
+    cache = LevelResultCache()
+    raw = np.zeros((1, PATTERN_SIZE), dtype=np.float32)
+    exact = post_process_patterns(raw, [difficulty], [score], seeds=[7])
+    cached = post_process_patterns(raw, [cache.quantize(difficulty)], [cache.quantize(score)], seeds=[7])
+    np.testing.assert_array_equal(cached, exact)
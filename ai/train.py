@@ -0,0 +1,41 @@
+# Train LevelGAN on game_levels/
+# Checkpoints (weights, optimizer state, epoch) go to models/training_checkpoint.pt every
+# --checkpoint-every epochs; --resume continues an interrupted run. Per-epoch samples/sec and
+# D/G/LSTM phase times are appended to models/training_stats.jsonl. --workers N trains with N
+# data-parallel CPU processes (torch.distributed, gloo).
+#
+# Examples:
+#   python train.py --epochs 200
+#   python train.py --epochs 200 --resume --workers 4
+#   python level_dataset.py game_levels level_archive/levels.bin && python train.py --dataset level_archive/levels.bin
+import argparse
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the level generator and LSTM.")
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=16, help="Batch size per process")
+    parser.add_argument('--no-gan', action='store_true', help="Skip generator/discriminator training")
+    parser.add_argument('--no-lstm', action='store_true', help="Skip LSTM training")
+    parser.add_argument('--checkpoint-every', type=int, default=10, help="Epochs between checkpoints")
+    parser.add_argument('--checkpoint', help="Checkpoint file (default models/training_checkpoint.pt)")
+    parser.add_argument('--stats', help="JSON-lines stats file (default models/training_stats.jsonl)")
+    parser.add_argument('--resume', action='store_true', help="Continue from the checkpoint")
+    parser.add_argument('--workers', type=int, default=1, help="Data-parallel training processes")
+    parser.add_argument('--dataset', help="Bit-packed dataset file from level_dataset.py (default: decode game_levels/)")
+    args = parser.parse_args()
+    if args.checkpoint_every < 1: parser.error("--checkpoint-every must be at least 1")
+
+    from level_gan import train_distributed
+    train_distributed(args.workers, epochs=args.epochs, batch_size=args.batch_size, use_gan=not args.no_gan,
+                      use_lstm=not args.no_lstm, checkpoint_every=args.checkpoint_every, resume=args.resume,
+                      checkpoint_path=args.checkpoint, stats_path=args.stats, dataset_path=args.dataset)
+
+
+if __name__ == "__main__":
+    main()